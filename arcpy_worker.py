@@ -0,0 +1,237 @@
+# ---------------------------------------------------------------------------
+# Name: ArcPy Worker
+#
+# Author: Patrick McKinney
+#
+# Created on: 10/19/2026
+#
+# Updated on: 10/19/2026
+#
+# Description: Long running worker process that imports arcpy (and arcgis.gis) once,
+# then runs the scripts in this repository as jobs submitted over a local socket.
+# Importing arcpy takes 10-30 seconds, so short scheduled scripts spend most of their
+# time starting up; running them in a warm worker skips this.
+#
+# Each job runs with a clean state: the arcpy environment settings are reset, the
+# memory workspace is cleared, and the working directory, sys.argv, sys.path, and any
+# environment variables passed with the job are put back afterwards.  Modules a job imports
+# from outside the Python installation (i.e., the helper modules next to the scripts) are
+# removed afterwards, so the next job imports its own copy instead of a stale or different one.
+# Jobs run one at a time, since arcpy is not designed to run tools from several threads.
+# Scripts that start their own process pools (i.e., sync_replicas.py) should still be run on their own,
+# since the processes they start cannot find functions defined in a script run by the worker.
+#
+# Start the worker (i.e., as a windows scheduled task that runs at startup):
+#     python arcpy_worker.py serve
+# Run a script in the worker:
+#     python arcpy_worker.py submit C:\GIS\Scripts\sde_to_file_geodatabase_replica.py
+# The client prints the job result as JSON and exits with 0 if the job succeeded.
+#
+# The worker listens on localhost only.  Set the ARCPY_WORKER_KEY environment variable
+# to the same value for the worker and clients; it is used to authenticate connections.
+# ---------------------------------------------------------------------------
+
+# Import system modules
+import contextlib
+import io
+import json
+import runpy
+import sys
+import time
+import traceback
+from multiprocessing.connection import Client
+from multiprocessing.connection import Listener
+from os import chdir
+from os import environ
+from os import getcwd
+from os import path
+
+# address the worker listens on
+ADDRESS = ('localhost', int(environ.get('ARCPY_WORKER_PORT', 6543)))
+# most characters of printed output returned with a job result
+MAX_OUTPUT = 100000
+# packages imported once by the worker; modules from these are kept after a job imports them
+PRELOADED_PACKAGES = ('arcpy', 'arcgis')
+
+
+# get key used to authenticate connections between the worker and clients
+def get_authkey():
+    key = environ.get('ARCPY_WORKER_KEY')
+    if not key:
+        raise EnvironmentError('Set the ARCPY_WORKER_KEY environment variable before starting the worker or submitting jobs')
+    return key.encode('utf-8')
+# end get_authkey
+
+
+# import modules the jobs use, so each job does not have to
+# returns dictionary of module name: seconds to import
+def load_modules(module_names=('arcpy', 'arcgis.gis')):
+    import_times = {}
+    for module_name in module_names:
+        start_time = time.perf_counter()
+        try:
+            __import__(module_name)
+        except ImportError:
+            # i.e., arcgis is not installed; jobs importing it will fail on their own
+            continue
+        import_times[module_name] = round(time.perf_counter() - start_time, 2)
+    return import_times
+# end load_modules
+
+
+# put arcpy back into a clean state between jobs
+def reset_arcpy():
+    arcpy = sys.modules.get('arcpy')
+    if arcpy is None:
+        return
+    arcpy.ResetEnvironments()
+    arcpy.ClearWorkspaceCache_management()
+    # remove anything left in the memory workspace
+    arcpy.Delete_management('memory')
+# end reset_arcpy
+
+
+# set environment variables for a job, returning the previous values so they can be put back
+def set_environment(variables):
+    previous = {name: environ.get(name) for name in variables}
+    environ.update({name: str(value) for name, value in variables.items()})
+    return previous
+# end set_environment
+
+
+# put environment variables back to the values they had before a job
+def restore_environment(previous):
+    for name, value in previous.items():
+        if value is None:
+            environ.pop(name, None)
+        else:
+            environ[name] = value
+# end restore_environment
+
+
+# remove modules a job imported, other than the preloaded packages and modules installed with Python
+# installed modules (i.e., numpy) do not change between jobs, and extension modules cannot be imported again safely
+def unload_job_modules(saved_modules):
+    installed = tuple(path.normcase(path.abspath(folder)) + path.sep for folder in {sys.prefix, sys.base_prefix, sys.exec_prefix})
+    for name in set(sys.modules) - saved_modules:
+        if name.split('.')[0] in PRELOADED_PACKAGES:
+            continue
+        module_file = getattr(sys.modules[name], '__file__', None)
+        if module_file and not path.normcase(path.abspath(module_file)).startswith(installed):
+            del sys.modules[name]
+# end unload_job_modules
+
+
+# run a job in this process
+# job is a dictionary with "script" (path to .py file), and optional "args" (list) and "env" (dictionary)
+# returns dictionary with status, exit code, duration, printed output, and error
+def run_job(job):
+    script = path.abspath(job['script'])
+    result = {'script': script, 'status': 'completed', 'exit_code': 0, 'duration': 0.0, 'output': '', 'error': None}
+    start_time = time.perf_counter()
+
+    # save state the script can change
+    saved_cwd = getcwd()
+    saved_argv = sys.argv
+    saved_path = list(sys.path)
+    saved_modules = set(sys.modules)
+    saved_env = set_environment(job.get('env', {}))
+    output = io.StringIO()
+    try:
+        # run the script as if it was started from the command line
+        chdir(path.dirname(script))
+        sys.argv = [script] + [str(arg) for arg in job.get('args', [])]
+        sys.path.insert(0, path.dirname(script))
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+            runpy.run_path(script, run_name='__main__')
+    except SystemExit as e:
+        # scripts call sys.exit() when there is nothing to do
+        code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        result['exit_code'] = code
+        if code != 0:
+            result['status'] = 'failed'
+            result['error'] = str(e.code)
+    except BaseException as e:
+        result['status'] = 'failed'
+        result['exit_code'] = 1
+        result['error'] = ''.join(traceback.format_exception(type(e), e, e.__traceback__))
+    finally:
+        chdir(saved_cwd)
+        sys.argv = saved_argv
+        sys.path[:] = saved_path
+        unload_job_modules(saved_modules)
+        restore_environment(saved_env)
+        try:
+            reset_arcpy()
+        except Exception as e:
+            result['error'] = (result['error'] or '') + f'\nFailed to reset arcpy: {e}'
+    result['output'] = output.getvalue()[-MAX_OUTPUT:]
+    result['duration'] = time.perf_counter() - start_time
+    return result
+# end run_job
+
+
+# start worker and run jobs as they are submitted, one at a time
+# a job of {"command": "stop"} stops the worker; {"command": "ping"} returns straight away
+def serve(address=ADDRESS, authkey=None):
+    import_times = load_modules()
+    print(f"{time.strftime('%I:%M%p')} : Loaded {import_times}; listening on {address[0]}:{address[1]}", flush=True)
+    with Listener(address, authkey=authkey or get_authkey()) as listener:
+        while True:
+            try:
+                conn = listener.accept()
+            except Exception as e:
+                # i.e., a client with the wrong key
+                print(f"{time.strftime('%I:%M%p')} : Rejected connection: {e}", flush=True)
+                continue
+            # a client that disconnects, times out, or sends something other than a job must not stop the worker
+            stop = False
+            with conn:
+                try:
+                    job = conn.recv()
+                    command = job.get('command', 'run')
+                    if command == 'stop':
+                        conn.send({'status': 'stopped'})
+                        stop = True
+                    elif command == 'ping':
+                        conn.send({'status': 'completed', 'modules': import_times})
+                    else:
+                        result = run_job(job)
+                        print(f"{time.strftime('%I:%M%p')} : {result['script']} {result['status']} in {round(result['duration'], 2)} seconds", flush=True)
+                        conn.send(result)
+                except (OSError, EOFError, AttributeError, KeyError, TypeError) as e:
+                    print(f"{time.strftime('%I:%M%p')} : Lost connection to client or received an invalid job: {e!r}", flush=True)
+            if stop:
+                break
+# end serve
+
+
+# submit a job to the worker and wait for its result
+def submit(job, address=ADDRESS, authkey=None):
+    with Client(address, authkey=authkey or get_authkey()) as conn:
+        conn.send(job)
+        return conn.recv()
+# end submit
+
+
+# run a script in the worker
+# args and env are passed to the script as sys.argv and environment variables
+def submit_script(script, args=None, env=None, address=ADDRESS, authkey=None):
+    return submit({'script': path.abspath(script), 'args': list(args or []), 'env': dict(env or {})}, address, authkey)
+# end submit_script
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] not in ('serve', 'submit', 'ping', 'stop'):
+        print('Usage: python arcpy_worker.py serve | submit <script.py> [args...] | ping | stop')
+        sys.exit(2)
+    command = sys.argv[1]
+    if command == 'serve':
+        serve()
+    else:
+        if command == 'submit':
+            job_result = submit_script(sys.argv[2], sys.argv[3:])
+        else:
+            job_result = submit({'command': command})
+        print(json.dumps(job_result, indent=2))
+        sys.exit(0 if job_result.get('status') in ('completed', 'stopped') else 1)
@@ -0,0 +1,81 @@
+# ---------------------------------------------------------------------------
+# Name: Benchmark ArcPy Worker
+#
+# Author: Patrick McKinney
+#
+# Created on: 10/19/2026
+#
+# Updated on: 10/19/2026
+#
+# Description: Compares running a script the usual way (a new Python process that imports arcpy)
+# with running it in a warm worker (see arcpy_worker.py).
+# Also times starting a new Python process that only imports arcpy, and a round trip to the
+# worker with no job, to show how much of each run is startup.
+# The worker must be running, and ARCPY_WORKER_KEY set, before running this script.
+#
+# Usage:
+#     python benchmark_arcpy_worker.py <script.py> [number of runs]
+# ---------------------------------------------------------------------------
+
+# Import system modules
+import arcpy_worker
+import statistics
+import subprocess
+import sys
+import time
+from os import path
+
+
+# time a function a number of times
+# returns list of times in seconds
+def time_runs(function, runs):
+    times = []
+    for run in range(runs):
+        start_time = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start_time)
+    return times
+# end time_runs
+
+
+# format minimum, median, and maximum of times
+def summarize(label, times):
+    return f'{label:<30} min {min(times):8.2f}s   median {statistics.median(times):8.2f}s   max {max(times):8.2f}s'
+# end summarize
+
+
+# run benchmarks for a script
+# returns list of summary lines
+def benchmark(script, runs=3):
+    script = path.abspath(script)
+    results = []
+
+    # cold: new Python process importing arcpy and nothing else
+    cold_import = time_runs(lambda: subprocess.run([sys.executable, '-c', 'import arcpy'], check=True), runs)
+    results.append(summarize('cold "import arcpy"', cold_import))
+
+    # cold: new Python process running the script, as a scheduled task does
+    cold_script = time_runs(lambda: subprocess.run([sys.executable, script], cwd=path.dirname(script), check=False), runs)
+    results.append(summarize('cold script', cold_script))
+
+    # warm: round trip to the worker with no job
+    warm_ping = time_runs(lambda: arcpy_worker.submit({'command': 'ping'}), runs)
+    results.append(summarize('warm ping', warm_ping))
+
+    # warm: script run in the worker
+    warm_script = time_runs(lambda: arcpy_worker.submit_script(script), runs)
+    results.append(summarize('warm script', warm_script))
+
+    results.append(f'\nMedian time saved per run: {statistics.median(cold_script) - statistics.median(warm_script):.2f}s')
+    return results
+# end benchmark
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print('Usage: python benchmark_arcpy_worker.py <script.py> [number of runs]')
+        sys.exit(2)
+    number_of_runs = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    print(f'Benchmarking {sys.argv[1]} with {number_of_runs} runs each\n')
+    for line in benchmark(sys.argv[1], number_of_runs):
+        print(line)
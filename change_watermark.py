@@ -0,0 +1,100 @@
+#-------------------------------------------------------------------------------
+# Name:        Change Watermark Helper Module
+#
+# Purpose:     Stores the newest edit date processed by the last successful run of
+#              a script (a "high-water mark") in a JSON file.  The next run selects
+#              only edits that are newer than this date, so consecutive runs do not
+#              overlap and a missed run does not lose changes.
+#
+#              The watermark should only be saved once the work for those edits has
+#              completed successfully.
+#
+# Author:      Patrick McKinney
+#
+# Created:     10/19/2026
+#
+# Updated:     10/19/2026
+#-------------------------------------------------------------------------------
+
+import json
+from datetime import datetime
+from datetime import timedelta
+from os import path
+from os import replace
+
+# format dates are stored in within the watermark file
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+
+
+# read the watermark from a JSON file
+# returns None if no run has completed yet
+def read_watermark(watermark_file):
+    if not path.exists(watermark_file):
+        return None
+    with open(watermark_file) as f:
+        contents = json.load(f)
+    return datetime.strptime(contents['watermark'], DATE_FORMAT)
+# end read_watermark
+
+
+# write the watermark to a JSON file
+# file is written to a temporary name and then renamed so a failed write does not lose the previous watermark
+def save_watermark(watermark_file, watermark):
+    temp_file = f'{watermark_file}.tmp'
+    with open(temp_file, 'w') as f:
+        json.dump({'watermark': watermark.strftime(DATE_FORMAT),
+                   'saved': datetime.now().strftime(DATE_FORMAT)}, f)
+    replace(temp_file, watermark_file)
+# end save_watermark
+
+
+# check if a layer is a shapefile
+# shapefiles only store dates without times, and do not accept the timestamp keyword
+def is_shapefile(layer):
+    return str(layer).lower().endswith('.shp')
+# end is_shapefile
+
+
+# SQL clause selecting records edited after the watermark
+# the timestamp keyword works for file and enterprise geodatabases
+# see https://pro.arcgis.com/en/pro-app/help/mapping/navigation/sql-reference-for-elements-used-in-query-expressions.htm
+# set dates_only for layers that store dates without times (i.e., shapefiles; see is_shapefile())
+def newer_than_clause(date_field, watermark, dates_only=False):
+    if dates_only:
+        # every edit on the watermark's day is stored as midnight, so "newer than" would drop
+        # later edits made on that day; select the whole day again instead
+        return f"{date_field} >= date '{watermark.strftime('%Y-%m-%d')}'"
+    # start at the millisecond the watermark falls within
+    # timestamps are written to the millisecond; rounding up would skip edits made later within
+    # that millisecond (i.e., watermark .123456 and edit .1238) when the database keeps microseconds,
+    # so records within the watermark's millisecond (usually just the newest record of the last run) are selected again
+    return f"{date_field} >= timestamp '{_millisecond_timestamp(watermark)}'"
+# end newer_than_clause
+
+
+# SQL clause selecting records edited at or before a date (i.e., the newest edit of a run being resumed)
+# together with newer_than_clause() for the same date, every record is selected at least once;
+# with timestamps, only records within the date's millisecond are selected by both
+def not_newer_than_clause(date_field, upper_bound, dates_only=False):
+    if dates_only:
+        return f"{date_field} <= date '{upper_bound.strftime('%Y-%m-%d')}'"
+    return f"{date_field} < timestamp '{_millisecond_timestamp(upper_bound + timedelta(milliseconds=1))}'"
+# end not_newer_than_clause
+
+
+# date rounded down to the millisecond, as text for a timestamp in a SQL clause
+def _millisecond_timestamp(value):
+    timestamp = value.strftime('%Y-%m-%d %H:%M:%S')
+    if value.microsecond // 1000:
+        timestamp += f'.{value.microsecond // 1000:03d}'
+    return timestamp
+# end _millisecond_timestamp
+
+
+# get the newest of the current watermark and a list of edit dates
+def advance(watermark, edit_dates):
+    dates = [d for d in edit_dates if d is not None]
+    if watermark is not None:
+        dates.append(watermark)
+    return max(dates) if dates else None
+# end advance
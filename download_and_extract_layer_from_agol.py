@@ -13,11 +13,13 @@
 #
 # Created:     7/9/2020
 #
-# Updated:     9/21/2022
+# Updated:     10/19/2026
 # -------------------------------------------------------------------------------
 
 # import modules
 import arcpy
+import geodatabase_swap
+import job_params
 from arcgis.gis import GIS
 from datetime import date
 from os import path
@@ -39,13 +41,13 @@ try:
     date_dir = date_today.strftime("%m%d%Y")
 
     # Create text file for logging results of script
-    log_file = path.join(r'Path\To\Directory', f'Report File {date_today}.txt')
+    log_file = path.join(job_params.get_job_param('log_dir', r'Path\To\Directory'), f'Report File {date_today}.txt')
     # variable to store messages for log file. Messages written in finally statement at end of script
     log_message = ''
 
     # 1. create new sub-directory using current date within parent directory
     # new directories are created within this directory
-    parent_dir = r'Path\To\Directory'
+    parent_dir = job_params.get_job_param('parent_dir', r'Path\To\Directory')
     # output directory
     out_dir = path.join(parent_dir, date_dir)
     # create sub-directory with current date
@@ -71,7 +73,7 @@ try:
     # name of item for use in script
     item_name = 'My_Layer'
     # reference item by item id
-    item_id = ''
+    item_id = job_params.get_job_param('item_id', '')
     # get item
     item = gis.content.get(item_id)
     # export result
@@ -99,10 +101,10 @@ try:
 
     # 3. Copy item into a persistent file geodatabase, overwriting existing dataset
     # file geodatabase storing dataset being overwritten
-    out_gdb = r'Path\To\Persistant_Database.gdb'
+    out_gdb = job_params.get_job_param('out_gdb', r'Path\To\Persistant_Database.gdb')
     # name of feature class
     # this example assumes a file geodatabase is downloaded from AGOL/Portal
-    feature_class = 'Some_GIS_Layer'
+    feature_class = job_params.get_job_param('feature_class', 'Some_GIS_Layer')
 
     # This next section assumes you exported item as a file geodatabase
     # If not, you'll need to update the following to work with your download format
@@ -118,12 +120,25 @@ try:
         if content.endswith('.gdb'):
             in_gdb = path.join(out_dir, content)
 
-    # copy feature class to persistant geodatatbase
-    arcpy.Copy_management(path.join(in_gdb, feature_class),
-                          path.join(out_gdb, feature_class))
+    # replace the dataset by copying it under a temporary name, checking it, and renaming it into place
+    # map services using the dataset are only affected for the few seconds the rename takes
+    # the old version is kept as "{feature_class}_previous"; see geodatabase_swap.py to put it back
+    # set to False to copy over the existing dataset directly
+    swap_mode = job_params.get_job_param('swap_mode', True)
 
-    # add message
-    log_message += f'\nCopied data from "{in_gdb}" to "{out_gdb}"\n'
+    if swap_mode:
+        row_count = geodatabase_swap.swap_in(arcpy, path.join(in_gdb, feature_class), out_gdb, feature_class)
+        # add message
+        log_message += f'\nSwapped {row_count} records from "{in_gdb}" into "{out_gdb}"; previous version kept as "{feature_class}{geodatabase_swap.PREVIOUS_SUFFIX}"\n'
+    else:
+        # copy feature class to persistant geodatatbase
+        arcpy.Copy_management(path.join(in_gdb, feature_class),
+                              path.join(out_gdb, feature_class))
+
+        # add message
+        log_message += f'\nCopied data from "{in_gdb}" to "{out_gdb}"\n'
+    # pass updated dataset to jobs that use it (see job_runner.py)
+    job_params.set_job_output('dataset', path.join(out_gdb, feature_class))
 # If an error occurs running geoprocessing tool(s) capture error and write message
 except (Exception, EnvironmentError) as e:
     tbE = sys.exc_info()[2]
@@ -131,6 +146,8 @@ except (Exception, EnvironmentError) as e:
     log_message += f"\nFailed at Line {tbE.tb_lineno}\n"
     # add the error message to the log message
     log_message += f"\nError: {str(e)}\n"
+    # tell the job runner the script failed (see job_runner.py)
+    job_params.report_job_failure(e)
 finally:
     # write message to log file
     try:
@@ -0,0 +1,293 @@
+# ---------------------------------------------------------------------------
+# Name: Edit Density Grid
+#
+# Author: Patrick McKinney
+#
+# Created on: 10/19/2026
+#
+# Updated on: 10/19/2026
+#
+# Description: Builds a grid counting how many edits have been made in each cell of an area,
+# using the Editor Tracking date field of a layer and the centroid of each edited feature.
+# The grid is saved to a NumPy (.npz) file and kept up to date between runs: each run only adds
+# edits made since the last run, and older counts fade by half every "half_life_days" so the
+# grid shows where edits are happening now.
+#
+# The hottest cells show where edits are concentrated.  The tile rebuild script uses the grid
+# to rebuild busy areas first, and the report shows where splitting a cache or export by area
+# would pay off most (i.e., when a few cells hold most of the edits).
+#
+# Can be imported as a helper module, or run as a script to update the grid and write a report.
+# ---------------------------------------------------------------------------
+
+# Import system modules
+import csv
+import math
+import numpy as np
+import sys
+import time
+from datetime import date
+from datetime import datetime
+from os import path
+from os import replace
+
+import change_watermark
+import job_params
+import tile_math
+
+
+# Class for a grid of edit counts
+# row 0 is the bottom row of the grid (lowest y values)
+class EditDensityGrid(object):
+    def __init__(self, xmin, ymin, cell_size, rows, cols, counts=None, watermark=None, updated=None, wkid=None, counted=None):
+        self.xmin = float(xmin)
+        self.ymin = float(ymin)
+        self.cell_size = float(cell_size)
+        self.rows = int(rows)
+        self.cols = int(cols)
+        self.counts = np.zeros((self.rows, self.cols), dtype='float64') if counts is None else counts
+        # newest edit date added to the grid
+        self.watermark = watermark
+        # object IDs of edits already counted that the next update selects again
+        # (i.e., edits made on the day of the watermark in a shapefile, which only stores dates)
+        self.counted = np.zeros(0, dtype='int64') if counted is None else counted
+        # when edits were last added; used to fade older counts
+        self.updated = updated
+        # edits falling outside the grid
+        self.outside = 0
+        # well-known ID of the spatial reference of the grid; extents compared to the grid must use it
+        self.wkid = wkid
+
+    # create empty grid covering an extent
+    @classmethod
+    def from_extent(cls, xmin, ymin, xmax, ymax, cell_size, wkid=None):
+        cols = max(1, int(np.ceil((xmax - xmin) / cell_size)))
+        rows = max(1, int(np.ceil((ymax - ymin) / cell_size)))
+        return cls(xmin, ymin, cell_size, rows, cols, wkid=wkid)
+
+    @property
+    def xmax(self):
+        return self.xmin + self.cols * self.cell_size
+
+    @property
+    def ymax(self):
+        return self.ymin + self.rows * self.cell_size
+
+    # check if grid covers the same cells as an extent and cell size, in the same spatial reference
+    def matches(self, xmin, ymin, xmax, ymax, cell_size, wkid=None):
+        other = EditDensityGrid.from_extent(xmin, ymin, xmax, ymax, cell_size)
+        return (np.isclose(self.xmin, other.xmin) and np.isclose(self.ymin, other.ymin) and
+                np.isclose(self.cell_size, other.cell_size) and (self.rows, self.cols) == (other.rows, other.cols) and
+                self.wkid == wkid)
+
+    # fade counts by half for every half_life_days since the grid was last updated
+    def decay(self, now, half_life_days):
+        if self.updated is None or not half_life_days:
+            return
+        days = max(0.0, (now - self.updated).total_seconds() / 86400)
+        self.counts *= 0.5 ** (days / half_life_days)
+
+    # add edits at x and y coordinates (i.e., feature centroids) to grid
+    def add_points(self, xs, ys, weight=1.0):
+        xs = np.asarray(xs, dtype='float64')
+        ys = np.asarray(ys, dtype='float64')
+        inside = (xs >= self.xmin) & (xs <= self.xmax) & (ys >= self.ymin) & (ys <= self.ymax)
+        self.outside += int((~inside).sum())
+        counts, _, _ = np.histogram2d(ys[inside], xs[inside], bins=[self.rows, self.cols],
+                                      range=[[self.ymin, self.ymax], [self.xmin, self.xmax]])
+        self.counts += counts * weight
+
+    # get extent (xmin, ymin, xmax, ymax) of a cell
+    def cell_extent(self, row, col):
+        xmin = self.xmin + col * self.cell_size
+        ymin = self.ymin + row * self.cell_size
+        return xmin, ymin, xmin + self.cell_size, ymin + self.cell_size
+
+    # get the busiest cells as a list of (count, row, col, extent), busiest first
+    def hottest(self, number=10):
+        flat = self.counts.ravel()
+        number = min(number, int((flat > 0).sum()))
+        if number == 0:
+            return []
+        top = np.argpartition(flat, -number)[-number:]
+        top = top[np.argsort(flat[top])[::-1]]
+        cells = [(float(flat[i]), int(i) // self.cols, int(i) % self.cols) for i in top]
+        return [(count, row, col, self.cell_extent(row, col)) for count, row, col in cells]
+
+    # sum of counts in the cells an extent (xmin, ymin, xmax, ymax) overlaps
+    # an extent ending exactly on a cell edge does not include the next cell (same rule as tile_math.tile_range())
+    def weight_for_extent(self, extent):
+        first_col = math.floor((extent[0] - self.xmin) / self.cell_size)
+        first_row = math.floor((extent[1] - self.ymin) / self.cell_size)
+        # points and lines with no width or height still fall within one cell
+        last_col = max(first_col, math.ceil((extent[2] - self.xmin) / self.cell_size - tile_math.EPSILON) - 1)
+        last_row = max(first_row, math.ceil((extent[3] - self.ymin) / self.cell_size - tile_math.EPSILON) - 1)
+        col_min = max(0, first_col)
+        row_min = max(0, first_row)
+        col_max = min(self.cols - 1, last_col)
+        row_max = min(self.rows - 1, last_row)
+        if col_min > col_max or row_min > row_max:
+            return 0.0
+        return float(self.counts[row_min:row_max + 1, col_min:col_max + 1].sum())
+
+    # share of all edits held by the busiest cells; a high share means edits are concentrated in a few areas
+    def concentration(self, number=10):
+        total = self.counts.sum()
+        if not total:
+            return 0.0
+        return sum(count for count, row, col, extent in self.hottest(number)) / float(total)
+
+    # write grid to .npz file
+    # file is written to a temporary name and then renamed so a failed run does not leave a broken grid
+    def save(self, grid_file):
+        temp_file = f'{grid_file}.tmp'
+        with open(temp_file, 'wb') as f:
+            np.savez(f, counts=self.counts,
+                     settings=np.array([self.xmin, self.ymin, self.cell_size, self.rows, self.cols]),
+                     watermark=np.array(self.watermark.strftime(change_watermark.DATE_FORMAT) if self.watermark else ''),
+                     updated=np.array(self.updated.strftime(change_watermark.DATE_FORMAT) if self.updated else ''),
+                     wkid=np.array(self.wkid if self.wkid else 0),
+                     counted=np.asarray(self.counted, dtype='int64'))
+        replace(temp_file, grid_file)
+
+    # read grid from .npz file
+    @classmethod
+    def load(cls, grid_file):
+        with np.load(grid_file) as contents:
+            xmin, ymin, cell_size, rows, cols = contents['settings'].tolist()
+            watermark = str(contents['watermark'])
+            updated = str(contents['updated'])
+            # grids saved before the spatial reference was stored have no wkid
+            wkid = int(contents['wkid']) if 'wkid' in contents.files else 0
+            counted = contents['counted'].copy() if 'counted' in contents.files else None
+            return cls(xmin, ymin, cell_size, rows, cols, contents['counts'].copy(),
+                       datetime.strptime(watermark, change_watermark.DATE_FORMAT) if watermark else None,
+                       datetime.strptime(updated, change_watermark.DATE_FORMAT) if updated else None,
+                       wkid or None, counted)
+# end EditDensityGrid
+
+
+# add edits made since the grid was last updated from a layer to the grid
+# the centroid of each edited feature is counted in the cell it falls in
+# spatial_reference is the spatial reference of the grid (i.e., of a cache); by default the layer's is used
+# returns number of edits added
+def update_from_layer(arcpy, grid, layer, date_field, half_life_days=30, spatial_reference=None, now=None):
+    now = now or datetime.now()
+    wkid = (spatial_reference or arcpy.Describe(layer).spatialReference).factoryCode
+    if grid.wkid is None:
+        grid.wkid = wkid
+    elif grid.wkid != wkid:
+        raise ValueError(f'Grid uses spatial reference {grid.wkid}, but edits are read in spatial reference {wkid}')
+    # the clause selects edits made on the day of the watermark (shapefiles, which only store dates) or within
+    # its millisecond again (see change_watermark.newer_than_clause()); edits counted by the last update are skipped
+    # note: in a shapefile, a feature edited again on the same day as the watermark is not counted again
+    dates_only = change_watermark.is_shapefile(layer)
+    unit = 'D' if dates_only else 'ms'
+    where_clause = None
+    if grid.watermark:
+        where_clause = change_watermark.newer_than_clause(date_field, grid.watermark, dates_only)
+    # SHAPE@X and SHAPE@Y are the centroid of each feature
+    edits = arcpy.da.FeatureClassToNumPyArray(layer, ['OID@', 'SHAPE@X', 'SHAPE@Y', date_field], where_clause,
+                                              spatial_reference, skip_nulls=True)
+    grid.decay(now, half_life_days)
+    grid.updated = now
+    if len(edits) == 0:
+        return 0
+    edit_dates = edits[date_field].astype(f'datetime64[{unit}]')
+    new_edits = edits
+    if grid.watermark:
+        counted = np.isin(edits['OID@'], grid.counted) & (edit_dates == np.datetime64(grid.watermark, unit))
+        new_edits = edits[~counted]
+    grid.add_points(new_edits['SHAPE@X'], new_edits['SHAPE@Y'])
+    newest = edits[date_field].max().astype('datetime64[us]').item()
+    grid.watermark = change_watermark.advance(grid.watermark, [newest])
+    # remember the edits the next update selects again
+    grid.counted = edits['OID@'][edit_dates == np.datetime64(grid.watermark, unit)].astype('int64')
+    return len(new_edits)
+# end update_from_layer
+
+
+# write busiest cells to a CSV file
+def write_report(grid, report_file, number=25):
+    with open(report_file, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['rank', 'row', 'col', 'edits', 'xmin', 'ymin', 'xmax', 'ymax'])
+        for rank, (count, row, col, extent) in enumerate(grid.hottest(number), start=1):
+            writer.writerow([rank, row, col, round(count, 2)] + [round(value, 3) for value in extent])
+# end write_report
+
+
+# attempt to run code. if an error occurs, break to except statement
+if __name__ == '__main__':
+    # capture the date the script is being run
+    date_today = date.today()
+    # convert date format to month-day-year (1-1-2020)
+    formatted_date_today = date_today.strftime("%m-%d-%Y")
+    # placeholder for messages for text file
+    log_message = ''
+    # text file to write messages to
+    # TODO: update path
+    log_file = path.join(job_params.get_job_param('log_dir', r'C:\GIS\Results'), f'Edit_Density_Report_{formatted_date_today}.txt')
+    try:
+        import arcpy
+
+        # layer with an Editor Tracking date field
+        # TODO: update path
+        reference_layer = job_params.get_job_param('reference_layer', r'C:\GIS\Data\reference_layer.shp')
+        # replace "last_edited_date" with whatever field represents the date last modified
+        date_field = job_params.get_job_param('date_field', 'last_edited_date')
+        # file storing the grid between runs
+        # TODO: update path
+        grid_file = job_params.get_job_param('density_grid', r'C:\GIS\Data\edit_density.npz')
+        # well-known ID of the spatial reference of the grid; None uses the layer's spatial reference
+        # set this to the spatial reference of the cache (i.e., 3857) when the grid is used by the tile rebuild script
+        wkid = job_params.get_job_param('wkid', None)
+        spatial_reference = arcpy.SpatialReference(wkid) if wkid else None
+        if not wkid:
+            wkid = arcpy.Describe(reference_layer).spatialReference.factoryCode
+        # area covered by the grid (xmin, ymin, xmax, ymax) and size of cells, in the units of the grid's spatial reference
+        # TODO: update to your area of interest; i.e., match the cells to your cache or export areas
+        grid_extent = job_params.get_job_param('grid_extent', [0, 0, 100000, 100000])
+        cell_size = job_params.get_job_param('cell_size', 1000)
+        # days for older edits to count half as much as new ones
+        half_life_days = job_params.get_job_param('half_life_days', 30)
+        # CSV file listing the busiest cells
+        report_file = path.join(path.dirname(log_file), f'Edit_Density_Hottest_Cells_{formatted_date_today}.csv')
+
+        # load grid, or start a new grid if there is none or its cells changed
+        grid = None
+        if path.exists(grid_file):
+            grid = EditDensityGrid.load(grid_file)
+            if not grid.matches(*grid_extent, cell_size, wkid):
+                log_message += f"{time.strftime('%I:%M%p')} : Grid extent, cell size, or spatial reference changed; rebuilding {grid_file}\n"
+                grid = None
+        if grid is None:
+            grid = EditDensityGrid.from_extent(*grid_extent, cell_size, wkid)
+
+        # add edits made since last run
+        added = update_from_layer(arcpy, grid, reference_layer, date_field, half_life_days, spatial_reference)
+        grid.save(grid_file)
+        log_message += f"{time.strftime('%I:%M%p')} : Added {added} edits to {grid_file} ({grid.outside} outside the grid)\n"
+
+        # report busiest cells
+        write_report(grid, report_file)
+        log_message += f"\nBusiest cells hold {grid.concentration(10):.0%} of recent edits (top 10 of {grid.rows * grid.cols} cells)\n"
+        for count, row, col, extent in grid.hottest(10):
+            log_message += f"\trow {row}, col {col}: {round(count, 1)} edits\n"
+        log_message += f"\nWrote busiest cells to {report_file}\n"
+    # If an error occurs capture error and write message
+    except (EnvironmentError, Exception) as e:
+        tbE = sys.exc_info()[2]
+        # add the line number the error occured to the log message
+        log_message += f"\nFailed at Line {tbE.tb_lineno}\n"
+        # add the error message to the log message
+        log_message += f"\nError: {str(e)}\n"
+        # tell the job runner the script failed (see job_runner.py)
+        job_params.report_job_failure(e)
+    finally:
+        # write message to log file
+        try:
+            with open(log_file, 'w') as f:
+                f.write(str(log_message))
+        except:
+            pass
@@ -7,6 +7,7 @@
 
 # import modules
 import arcpy
+import job_params
 import sys
 import time
 from datetime import date
@@ -20,12 +21,12 @@ formatted_date_today = date_today.strftime("%m-%d-%Y")
 log_message = ''
 # text file to write messages to
 # TODO: update path
-log_file = path.join(r'C:\GIS\Results', f'Database_Maint_Report_{date_today}.txt')
+log_file = path.join(job_params.get_job_param('log_dir', r'C:\GIS\Results'), f'Database_Maint_Report_{date_today}.txt')
 
 try:
     # database connection
     # TODO: update path for sde connection
-    dbase = r"SDE Connection"
+    dbase = job_params.get_job_param('dbase', r"SDE Connection")
     # set workspace to geodatabase
     arcpy.env.workspace = dbase
     # get list of all:
@@ -83,6 +84,8 @@ except (Exception, EnvironmentError) as e:
     log_message += f"\nFailed at Line {tbE.tb_lineno}\n"
     # Write the error message to the log file
     log_message += f"Error: {str(e)}"
+    # tell the job runner the script failed (see job_runner.py)
+    job_params.report_job_failure(e)
 finally:
     # write message to log file
     try:
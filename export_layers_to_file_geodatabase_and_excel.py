@@ -15,6 +15,7 @@
 # -------------------------------------------------------------------------------
 
 import arcpy
+import job_params
 import sys
 from os import path
 from os import makedirs
@@ -30,13 +31,13 @@ try:
 
     # Create text file for logging results of script
     # update this variable
-    log_file = path.join(r'[path]\[to]\[location]', f'Report File Name {formatted_date_today}.txt')
+    log_file = path.join(job_params.get_job_param('log_dir', r'[path]\[to]\[location]'), f'Report File Name {formatted_date_today}.txt')
     # variable to store messages for log file. Messages written in finally statement at end of script
     log_message = ''
 
     # enterprise or file geodatabase
     # update this variable
-    geodatabase = r''
+    geodatabase = job_params.get_job_param('geodatabase', r'')
     # layers
     # update this variable
     # recommended to use underscores in naming convention of second element of sub-list
@@ -46,7 +47,7 @@ try:
     # 1. create new directory
     # parent directory
     # update this variable
-    parent_dir = r'[path]\[to]\[location]'
+    parent_dir = job_params.get_job_param('parent_dir', r'[path]\[to]\[location]')
     # output directory
     out_dir = path.join(parent_dir, date_gdb)
     # create sub-directory with current date
@@ -103,6 +104,10 @@ try:
         # add message
         log_message += f'\nExported {fc} layer to Microsof Excel format\n'
     # end for
+
+    # pass output locations to jobs that use them (see job_runner.py)
+    job_params.set_job_output('out_gdb', out_gdb)
+    job_params.set_job_output('out_dir', out_dir)
 # If an error occurs running geoprocessing tool(s) capture error and write message
 except (Exception, EnvironmentError) as e:
     tbE = sys.exc_info()[2]
@@ -110,6 +115,8 @@ except (Exception, EnvironmentError) as e:
     log_message += f"\nFailed at Line {tbE.tb_lineno}\n"
     # add the error message to the log message
     log_message += "\nError: {str(e)}\n"
+    # tell the job runner the script failed (see job_runner.py)
+    job_params.report_job_failure(e)
 finally:
     try:
         if cursor:
@@ -0,0 +1,133 @@
+#-------------------------------------------------------------------------------
+# Name:        Geodatabase Swap Helper Module
+#
+# Purpose:     Replaces a dataset in a geodatabase with a new version without leaving
+#              it empty or partly copied while the copy runs.
+#
+#              The new version is copied into the geodatabase under a temporary name
+#              (name_staging), and its row count and fields are checked.  The live
+#              dataset is then renamed to name_previous and the new version is renamed
+#              to the live name.  Renaming only takes seconds, so map services using
+#              the dataset are only affected for that time.  The previous version is
+#              kept so it can be swapped back with rollback().
+#
+#              Renaming needs an exclusive lock.  Services that hold schema locks on the
+#              dataset have to be stopped for the swap or have schema locking disabled.
+#
+# Author:      Patrick McKinney
+#
+# Created:     10/19/2026
+#
+# Updated:     10/19/2026
+#-------------------------------------------------------------------------------
+
+import time
+from os import path
+
+# suffixes for the temporary and previous versions of a dataset
+STAGING_SUFFIX = '_staging'
+PREVIOUS_SUFFIX = '_previous'
+
+
+# get (name, type, length) of each field in a dataset, ignoring fields the geodatabase manages
+def get_schema(arcpy, dataset):
+    fields = []
+    for field in arcpy.ListFields(dataset):
+        if field.type in ('OID', 'Geometry', 'GlobalID') or field.name.lower().startswith(('shape_', 'shape.')):
+            continue
+        fields.append((field.name.lower(), field.type, field.length))
+    return sorted(fields)
+# end get_schema
+
+
+# verify copied dataset has the same rows and fields as the source
+# if the live dataset exists its fields are compared too, since services using it expect the same fields
+# raises ValueError when the copy does not match
+def validate_copy(arcpy, source, staging, live=None, allow_schema_change=False):
+    source_count = int(arcpy.GetCount_management(source)[0])
+    staging_count = int(arcpy.GetCount_management(staging)[0])
+    if source_count != staging_count:
+        raise ValueError(f'Copied {staging_count} of {source_count} rows from {source}')
+    staging_schema = get_schema(arcpy, staging)
+    if get_schema(arcpy, source) != staging_schema:
+        raise ValueError(f'Fields of {staging} do not match {source}')
+    if live and arcpy.Exists(live) and not allow_schema_change:
+        live_schema = get_schema(arcpy, live)
+        if live_schema != staging_schema:
+            added = sorted(set(staging_schema) - set(live_schema))
+            removed = sorted(set(live_schema) - set(staging_schema))
+            raise ValueError(f'Fields of new version differ from {live}; added {added}, removed {removed}')
+    return staging_count
+# end validate_copy
+
+
+# rename a dataset, trying again if it is locked
+def rename(arcpy, dataset, new_name, retries=3, retry_wait=10):
+    for attempt in range(retries):
+        try:
+            arcpy.Rename_management(dataset, new_name)
+            return
+        except arcpy.ExecuteError:
+            if attempt == retries - 1:
+                raise
+            time.sleep(retry_wait)
+# end rename
+
+
+# swap the live dataset with another dataset in the same geodatabase
+# the live dataset is renamed to previous_name, then other_name is renamed to the live name
+# if the second rename fails the live dataset is put back
+def swap(arcpy, gdb, live_name, other_name, previous_name):
+    live = path.join(gdb, live_name)
+    previous = path.join(gdb, previous_name)
+    live_existed = arcpy.Exists(live)
+    if live_existed:
+        rename(arcpy, live, previous)
+    try:
+        rename(arcpy, path.join(gdb, other_name), live)
+    except Exception:
+        if live_existed:
+            rename(arcpy, previous, live)
+        raise
+# end swap
+
+
+# replace dataset "name" in geodatabase "gdb" with a copy of "source"
+# returns number of rows in the new version
+def swap_in(arcpy, source, gdb, name, allow_schema_change=False):
+    live = path.join(gdb, name)
+    staging = path.join(gdb, name + STAGING_SUFFIX)
+    previous = path.join(gdb, name + PREVIOUS_SUFFIX)
+
+    # remove a staging copy left by a failed run
+    if arcpy.Exists(staging):
+        arcpy.Delete_management(staging)
+    # build new version while the live dataset is still in use
+    arcpy.Copy_management(source, staging)
+    try:
+        row_count = validate_copy(arcpy, source, staging, live, allow_schema_change)
+    except ValueError:
+        arcpy.Delete_management(staging)
+        raise
+
+    # only one previous version is kept
+    if arcpy.Exists(previous):
+        arcpy.Delete_management(previous)
+    swap(arcpy, gdb, name, name + STAGING_SUFFIX, name + PREVIOUS_SUFFIX)
+    return row_count
+# end swap_in
+
+
+# put the previous version of a dataset back in place
+# the version being replaced becomes the previous version, so rollback can be undone by running it again
+def rollback(arcpy, gdb, name):
+    previous_name = name + PREVIOUS_SUFFIX
+    if not arcpy.Exists(path.join(gdb, previous_name)):
+        raise ValueError(f'No previous version of {name} in {gdb}')
+    staging = path.join(gdb, name + STAGING_SUFFIX)
+    if arcpy.Exists(staging):
+        arcpy.Delete_management(staging)
+    # move live dataset aside under the staging name, then swap names around
+    swap(arcpy, gdb, name, previous_name, name + STAGING_SUFFIX)
+    rename(arcpy, path.join(gdb, name + STAGING_SUFFIX), path.join(gdb, previous_name))
+# end rollback
@@ -0,0 +1,191 @@
+#-------------------------------------------------------------------------------
+# Name:        Grid Index Helper Module
+#
+# Purpose:     Keeps a grid layer (i.e., the grids used for rebuilding cached map
+#              service tiles) in a prebuilt spatial index (a packed R-tree) saved to a
+#              JSON file.  The index is only rebuilt when the grid layer changes on disk.
+#              Changed features can then be checked against the index in bulk,
+#              returning the ID and label of each grid they fall within, without making
+#              feature layers or selecting by location.
+#
+#              The index stores the extent of each grid, so it assumes grids are
+#              rectangles, which is how grid layers for cached map services are drawn.
+#
+# Author:      Patrick McKinney
+#
+# Created:     10/19/2026
+#
+# Updated:     10/19/2026
+#-------------------------------------------------------------------------------
+
+import json
+import math
+from os import listdir
+from os import path
+from os import replace
+
+# number of entries in each node of the R-tree
+NODE_CAPACITY = 16
+# version of index file format; old index files are rebuilt
+INDEX_VERSION = 2
+# files that make up a shapefile; a change to any of these means the grid layer changed
+SHAPEFILE_EXTENSIONS = ['.shp', '.shx', '.dbf', '.prj']
+# files holding the tables of a file geodatabase
+GDB_TABLE_EXTENSIONS = ['.gdbtable', '.gdbtablx']
+
+
+# get the size and modified time of the file(s) making up a grid layer
+# returns an empty list when the files cannot be found; the index is then rebuilt every run
+def source_signature(grid_layer):
+    base, extension = path.splitext(grid_layer)
+    if extension.lower() == '.shp':
+        files = [base + ext for ext in SHAPEFILE_EXTENSIONS]
+        signature = []
+        for file in files:
+            if path.exists(file):
+                signature.append([path.basename(file), path.getsize(file), path.getmtime(file)])
+        return signature
+    # feature class in a file geodatabase, possibly within a feature dataset (i.e., C:\GIS\Data.gdb\Dataset\Grids)
+    # the modified time of the .gdb folder does not change when tables within it are edited,
+    # so sign the tables themselves; an edit to any table in the geodatabase rebuilds the index
+    gdb = grid_layer
+    while gdb and not gdb.lower().endswith('.gdb'):
+        parent = path.dirname(gdb)
+        if parent == gdb:
+            return []
+        gdb = parent
+    if not path.isdir(gdb):
+        return []
+    sizes = []
+    times = []
+    for file in listdir(gdb):
+        if path.splitext(file)[1].lower() in GDB_TABLE_EXTENSIONS:
+            sizes.append(path.getsize(path.join(gdb, file)))
+            times.append(path.getmtime(path.join(gdb, file)))
+    if not sizes:
+        return []
+    return [[path.basename(gdb), len(sizes), sum(sizes), max(times)]]
+# end source_signature
+
+
+# get the extent covering a list of extents
+def union_extent(extents):
+    return [min(e[0] for e in extents), min(e[1] for e in extents),
+            max(e[2] for e in extents), max(e[3] for e in extents)]
+# end union_extent
+
+
+# check if two extents (xmin, ymin, xmax, ymax) overlap or touch
+def extents_intersect(a, b):
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+# end extents_intersect
+
+
+# pack entries into an R-tree using sort-tile-recursive (STR) loading
+# entries are [extent, grid_id, label]; nodes are [extent, children, is_leaf]
+def pack_tree(entries, capacity=NODE_CAPACITY):
+    if not entries:
+        return None
+    nodes = [[entry[0], entry, True] for entry in entries]
+    level = [[union_extent([n[0] for n in group]), [n[1] for n in group], True]
+             for group in _str_groups(nodes, capacity)]
+    # build parent levels until one root node is left
+    while len(level) > 1:
+        level = [[union_extent([n[0] for n in group]), group, False]
+                 for group in _str_groups(level, capacity)]
+    return level[0]
+# end pack_tree
+
+
+# split nodes into groups of nearby nodes, sorted into vertical slices then by y
+def _str_groups(nodes, capacity):
+    slice_count = math.ceil(math.sqrt(math.ceil(len(nodes) / capacity)))
+    slice_size = slice_count * capacity
+    nodes = sorted(nodes, key=lambda n: n[0][0] + n[0][2])
+    groups = []
+    for i in range(0, len(nodes), slice_size):
+        vertical_slice = sorted(nodes[i:i + slice_size], key=lambda n: n[0][1] + n[0][3])
+        for j in range(0, len(vertical_slice), capacity):
+            groups.append(vertical_slice[j:j + capacity])
+    return groups
+# end _str_groups
+
+
+# Class for a grid layer held in a packed R-tree
+class GridIndex(object):
+    def __init__(self, root, signature=None):
+        self.root = root
+        self.signature = signature
+
+    # create index from (grid_id, label, (xmin, ymin, xmax, ymax)) records
+    @classmethod
+    def from_records(cls, records, signature=None):
+        entries = [[list(extent), grid_id, label] for grid_id, label, extent in records]
+        return cls(pack_tree(entries), signature)
+
+    # get [extent, grid_id, label] entries whose extent intersects an extent
+    def query(self, extent):
+        results = []
+        if self.root is None:
+            return results
+        stack = [self.root]
+        while stack:
+            node_extent, children, is_leaf = stack.pop()
+            if not extents_intersect(node_extent, extent):
+                continue
+            if is_leaf:
+                results.extend(entry for entry in children if extents_intersect(entry[0], extent))
+            else:
+                stack.extend(children)
+        return results
+
+    # get the (grid_id, label) of each grid intersecting any of a list of extents
+    # refine is an optional function(query_number, grid_extent) for an exact check against the actual geometry
+    def query_many(self, extents, refine=None):
+        selected = {}
+        for number, extent in enumerate(extents):
+            for grid_extent, grid_id, label in self.query(extent):
+                if grid_id in selected:
+                    continue
+                if refine is None or refine(number, grid_extent):
+                    selected[grid_id] = label
+        return sorted(selected.items(), key=lambda item: item[0])
+
+    # write index to a JSON file
+    # file is written to a temporary name and then renamed so a failed run does not leave a broken index
+    def save(self, index_file):
+        temp_file = f'{index_file}.tmp'
+        with open(temp_file, 'w') as f:
+            json.dump({'version': INDEX_VERSION, 'signature': self.signature, 'root': self.root}, f)
+        replace(temp_file, index_file)
+
+    # read index from a JSON file
+    @classmethod
+    def load(cls, index_file):
+        with open(index_file) as f:
+            contents = json.load(f)
+        if contents.get('version') != INDEX_VERSION:
+            raise ValueError(f'{index_file} was written by a different version of grid_index')
+        return cls(contents['root'], contents['signature'])
+# end GridIndex
+
+
+# get index for a grid layer, rebuilding it only if the grid layer changed since it was saved
+# read_records is a function returning (grid_id, label, (xmin, ymin, xmax, ymax)) records of the grid layer
+# wkid is the well-known ID of the spatial reference read_records projects extents to (i.e., the cache's);
+# the index is also rebuilt when it, or the path of the grid layer, changes
+# returns the index and whether it was rebuilt
+def load_or_build(index_file, grid_layer, read_records, wkid=None):
+    files = source_signature(grid_layer)
+    signature = [path.normcase(path.abspath(grid_layer)), wkid, files]
+    if path.exists(index_file):
+        try:
+            index = GridIndex.load(index_file)
+            if files and index.signature == signature:
+                return index, False
+        except (ValueError, KeyError):
+            pass
+    index = GridIndex.from_records(read_records(), signature)
+    index.save(index_file)
+    return index, True
+# end load_or_build
@@ -0,0 +1,67 @@
+#-------------------------------------------------------------------------------
+# Name:        Job Parameters Helper Module
+#
+# Purpose:     Lets scripts read settings passed in by the job runner (see job_runner.py)
+#              and pass outputs back to it for later jobs to use.
+#
+#              When a script is run on its own (i.e., as a windows scheduled task)
+#              no settings are passed in, so each setting falls back to the default the
+#              script gives, and outputs are ignored.
+#
+# Author:      Patrick McKinney
+#
+# Created:     10/19/2026
+#
+# Updated:     10/19/2026
+#-------------------------------------------------------------------------------
+
+import json
+from os import environ
+from os import path
+from os import replace
+
+# environment variable holding settings for the job as JSON
+PARAMS_VARIABLE = 'JOB_PARAMS'
+# environment variable holding path to JSON file the job writes outputs to
+OUTPUTS_VARIABLE = 'JOB_OUTPUTS_FILE'
+
+
+# get a setting passed in by the job runner, or the default if there is none
+def get_job_param(name, default=None):
+    params = json.loads(environ.get(PARAMS_VARIABLE) or '{}')
+    return params.get(name, default)
+# end get_job_param
+
+
+# read outputs written so far by the job
+def read_job_outputs():
+    outputs_file = environ.get(OUTPUTS_VARIABLE)
+    if not outputs_file or not path.exists(outputs_file):
+        return {}
+    with open(outputs_file) as f:
+        return json.load(f)
+# end read_job_outputs
+
+
+# pass an output (i.e., path to a geodatabase the script created) back to the job runner
+# value must be a string, number, list, or dictionary so it can be written as JSON
+def set_job_output(name, value):
+    outputs_file = environ.get(OUTPUTS_VARIABLE)
+    if not outputs_file:
+        return
+    outputs = read_job_outputs()
+    outputs[name] = value
+    temp_file = f'{outputs_file}.tmp'
+    with open(temp_file, 'w') as f:
+        json.dump(outputs, f)
+    replace(temp_file, outputs_file)
+# end set_job_output
+
+
+# tell the job runner the script failed
+# the scripts catch their errors so they can write them to a log file,
+# which means the job runner cannot tell from the exit code alone
+def report_job_failure(error):
+    set_job_output('status', 'failed')
+    set_job_output('error', str(error))
+# end report_job_failure
@@ -0,0 +1,391 @@
+# ---------------------------------------------------------------------------
+# Name: Job Runner
+#
+# Author: Patrick McKinney
+#
+# Created on: 10/19/2026
+#
+# Updated on: 10/19/2026
+#
+# Description: Runs the scripts in this repository as one nightly batch, in place of a separate
+# windows scheduled task for each script.  Jobs, their settings, and which jobs must finish
+# before others start are listed in a TOML or YAML file.  Jobs that do not depend on each other
+# run at the same time, up to a limit.  A job can use the outputs of the jobs it depends on
+# (i.e., the path of a geodatabase a job created) in its settings.
+#
+# Settings are passed to each script as JSON in the JOB_PARAMS environment variable, and the
+# scripts read them with job_params.get_job_param(), falling back to their own defaults.
+# Scripts pass outputs back with job_params.set_job_output().
+#
+# When all jobs have finished, the time taken by each job, the total time, and the critical path
+# (the chain of dependent jobs that set the total time) are written to the log file.
+#
+# Example jobs file (TOML):
+#     [runner]
+#     max_parallel = 3
+#     log_dir = 'C:\GIS\Results'
+#     # "process" runs each job in a new Python process; "worker" runs jobs in arcpy_worker.py
+#     executor = "process"
+#
+#     [jobs.replica]
+#     script = "sde_to_file_geodatabase_replica.py"
+#     params = { sde = 'C:\GIS\Connections\gis.sde', child_gdb = '\\server\share\file.gdb' }
+#
+#     [jobs.export]
+#     script = "export_layers_to_file_geodatabase_and_excel.py"
+#     depends_on = ["replica"]
+#     params = { geodatabase = "${jobs.replica.outputs.child_gdb}" }
+#
+#     [jobs.maintenance]
+#     script = "enterprise_geodatabase_maintenance_tasks.py"
+#     params = { dbase = 'C:\GIS\Connections\gis_admin.sde' }
+#
+#     [jobs.rebuild_tiles]
+#     script = "rebuild_map_service_tiles_in_updated_areas.py"
+#     depends_on = ["maintenance"]
+#     # seconds to wait before stopping the job
+#     timeout = 14400
+#
+# Usage:
+#     python job_runner.py nightly_jobs.toml
+# ---------------------------------------------------------------------------
+
+# Import system modules
+import json
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+from datetime import date
+from os import environ
+from os import path
+from os import remove
+
+import job_params
+
+# reference to an output of another job within a setting, i.e., ${jobs.replica.outputs.child_gdb}
+OUTPUT_REFERENCE = re.compile(r'\$\{jobs\.([\w-]+)\.outputs\.([\w-]+)\}')
+
+
+# Class for a job listed in the jobs file
+class Job(object):
+    def __init__(self, name, script, depends_on=None, params=None, timeout=None, executor=None):
+        self.name = name
+        self.script = script
+        self.depends_on = list(depends_on or [])
+        self.params = dict(params or {})
+        # seconds to wait before stopping the job; None waits until it finishes
+        # not supported for jobs run in the worker, which cannot stop a script part way through
+        self.timeout = timeout
+        # "process" or "worker"; None uses the runner's setting
+        self.executor = executor
+# end Job
+
+
+# read jobs file; format is based on the file extension (.toml, .yaml, or .yml)
+def read_config(config_file):
+    extension = path.splitext(config_file)[1].lower()
+    if extension == '.toml':
+        try:
+            import tomllib
+            with open(config_file, 'rb') as f:
+                return tomllib.load(f)
+        except ImportError:
+            # Python versions before 3.11
+            import toml
+            with open(config_file) as f:
+                return toml.load(f)
+    if extension in ('.yaml', '.yml'):
+        import yaml
+        with open(config_file) as f:
+            return yaml.safe_load(f)
+    raise ValueError(f'{config_file} must be a .toml, .yaml, or .yml file')
+# end read_config
+
+
+# create jobs from the "jobs" section of the jobs file
+# script paths are relative to the folder of the jobs file
+def parse_jobs(config, config_dir=''):
+    jobs = []
+    for name, settings in (config.get('jobs') or {}).items():
+        if 'script' not in settings:
+            raise ValueError(f'Job "{name}" is missing "script"')
+        jobs.append(Job(name, path.join(config_dir, settings['script']), settings.get('depends_on'),
+                        settings.get('params'), settings.get('timeout'), settings.get('executor')))
+    check_jobs(jobs)
+    return jobs
+# end parse_jobs
+
+
+# get names of jobs whose outputs a setting refers to
+def referenced_jobs(value):
+    if isinstance(value, str):
+        return {match.group(1) for match in OUTPUT_REFERENCE.finditer(value)}
+    if isinstance(value, list):
+        return set().union(*[referenced_jobs(item) for item in value]) if value else set()
+    if isinstance(value, dict):
+        return set().union(*[referenced_jobs(item) for item in value.values()]) if value else set()
+    return set()
+# end referenced_jobs
+
+
+# verify job names are unique, dependencies exist, settings only use outputs of jobs they depend on,
+# and there are no circular dependencies
+def check_jobs(jobs, default_executor=None):
+    names = [job.name for job in jobs]
+    if len(names) != len(set(names)):
+        raise ValueError('Job names must be unique')
+    for job in jobs:
+        if job.timeout and (job.executor or default_executor) == 'worker':
+            raise ValueError(f'Job "{job.name}" has a timeout, which is not supported for jobs run in the worker; use executor = "process"')
+        for dependency in job.depends_on:
+            if dependency not in names:
+                raise ValueError(f'Job "{job.name}" depends on unknown job "{dependency}"')
+        for reference in referenced_jobs(job.params):
+            if reference not in job.depends_on:
+                raise ValueError(f'Job "{job.name}" uses outputs of "{reference}" but does not depend on it')
+    remaining = {job.name: set(job.depends_on) for job in jobs}
+    while remaining:
+        ready = [name for name, dependencies in remaining.items() if not dependencies & set(remaining)]
+        if not ready:
+            raise ValueError(f'Circular dependency between jobs: {", ".join(sorted(remaining))}')
+        for name in ready:
+            del remaining[name]
+# end check_jobs
+
+
+# replace references to outputs of other jobs within settings
+# a setting that is only a reference keeps the type of the output (i.e., a list)
+def resolve_params(value, outputs):
+    if isinstance(value, str):
+        def lookup(match):
+            job_name, output_name = match.groups()
+            if output_name not in outputs.get(job_name, {}):
+                raise KeyError(f'Job "{job_name}" did not output "{output_name}"')
+            return outputs[job_name][output_name]
+        whole = OUTPUT_REFERENCE.fullmatch(value)
+        if whole:
+            return lookup(whole)
+        return OUTPUT_REFERENCE.sub(lambda match: str(lookup(match)), value)
+    if isinstance(value, list):
+        return [resolve_params(item, outputs) for item in value]
+    if isinstance(value, dict):
+        return {key: resolve_params(item, outputs) for key, item in value.items()}
+    return value
+# end resolve_params
+
+
+# run a job's script in a new Python process
+# returns exit code and error message
+def run_in_process(job, env):
+    try:
+        completed = subprocess.run([sys.executable, job.script], cwd=path.dirname(path.abspath(job.script)),
+                                   env=dict(environ, **env), timeout=job.timeout,
+                                   stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    except subprocess.TimeoutExpired:
+        return 1, f'Stopped after {job.timeout} seconds'
+    error = completed.stdout[-2000:] if completed.returncode != 0 else None
+    return completed.returncode, error
+# end run_in_process
+
+
+# run a job's script in the warm arcpy worker
+# returns exit code and error message
+# the worker runs one job at a time; run_job() holds _worker_lock while a job runs in it
+def run_in_worker(job, env):
+    import arcpy_worker
+    result = arcpy_worker.submit_script(job.script, env=env)
+    return result['exit_code'], result['error']
+# end run_in_worker
+
+
+_worker_lock = threading.Lock()
+
+
+# run one job and collect its outputs
+# returns dictionary with name, status, start and finish (seconds from start of run), duration, outputs, and error
+def run_job(job, params, default_executor, run_start):
+    start = time.perf_counter() - run_start
+    result = {'name': job.name, 'status': 'completed', 'start': start, 'finish': start,
+              'duration': 0.0, 'outputs': {}, 'error': None}
+    outputs_file = path.join(tempfile.gettempdir(), f'job_outputs_{job.name}_{int(time.time() * 1000)}.json')
+    env = {job_params.PARAMS_VARIABLE: json.dumps(params), job_params.OUTPUTS_VARIABLE: outputs_file}
+    try:
+        executor = job.executor or default_executor
+        if executor == 'worker':
+            # time spent waiting for the worker is not part of the job
+            with _worker_lock:
+                result['start'] = time.perf_counter() - run_start
+                exit_code, error = run_in_worker(job, env)
+        else:
+            exit_code, error = run_in_process(job, env)
+        if path.exists(outputs_file):
+            with open(outputs_file) as f:
+                result['outputs'] = json.load(f)
+        if exit_code != 0 or result['outputs'].get('status') == 'failed':
+            result['status'] = 'failed'
+            result['error'] = result['outputs'].get('error') or error or f'Exit code {exit_code}'
+    except Exception as e:
+        result['status'] = 'failed'
+        result['error'] = str(e)
+    finally:
+        if path.exists(outputs_file):
+            remove(outputs_file)
+    result['finish'] = time.perf_counter() - run_start
+    result['duration'] = result['finish'] - result['start']
+    return result
+# end run_job
+
+
+# run jobs, at most max_parallel at a time, starting each once the jobs it depends on have completed
+# jobs depending on a job that failed are skipped
+# runner can be replaced (i.e., with a fake function) to check the scheduling
+# on_result is an optional function(result) called as each job finishes
+# returns dictionary of job name: result
+def run_jobs(jobs, max_parallel=2, default_executor='process', runner=run_job, on_result=None):
+    check_jobs(jobs, default_executor)
+    run_start = time.perf_counter()
+    waiting = {job.name: job for job in jobs}
+    running = {}
+    results = {}
+
+    def record(result):
+        results[result['name']] = result
+        if on_result:
+            on_result(result)
+
+    # check if a job runs in the worker
+    def in_worker(job):
+        return (job.executor or default_executor) == 'worker'
+
+    with ThreadPoolExecutor(max_workers=max_parallel) as executor:
+        while waiting or running:
+            for name in list(waiting):
+                job = waiting[name]
+                statuses = [results[d]['status'] if d in results else None for d in job.depends_on]
+                if any(status in ('failed', 'skipped') for status in statuses):
+                    del waiting[name]
+                    now = time.perf_counter() - run_start
+                    record({'name': name, 'status': 'skipped', 'start': now, 'finish': now, 'duration': 0.0,
+                            'outputs': {}, 'error': 'A job it depends on did not complete'})
+                elif all(status == 'completed' for status in statuses) and len(running) < max_parallel:
+                    # the worker runs one job at a time; keep other worker jobs waiting here, so they do not take
+                    # a slot from jobs that could run in their own process
+                    if in_worker(job) and any(in_worker(other) for other in running.values()):
+                        continue
+                    del waiting[name]
+                    outputs = {d: results[d]['outputs'] for d in job.depends_on}
+                    try:
+                        params = resolve_params(job.params, outputs)
+                    except KeyError as e:
+                        now = time.perf_counter() - run_start
+                        record({'name': name, 'status': 'failed', 'start': now, 'finish': now, 'duration': 0.0,
+                                'outputs': {}, 'error': str(e)})
+                        continue
+                    running[executor.submit(runner, job, params, default_executor, run_start)] = job
+
+            if not running:
+                continue
+
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in done:
+                job = running.pop(future)
+                try:
+                    record(future.result())
+                except Exception as e:
+                    now = time.perf_counter() - run_start
+                    record({'name': job.name, 'status': 'failed', 'start': now, 'finish': now, 'duration': 0.0,
+                            'outputs': {}, 'error': str(e)})
+    return results
+# end run_jobs
+
+
+# get the chain of dependent jobs with the longest total duration
+# this chain sets how long the whole run takes, so it is where speeding up jobs matters
+# returns list of job names in the order they ran, and total duration in seconds
+def critical_path(jobs, results):
+    longest = {}
+    previous = {}
+    remaining = {job.name: job for job in jobs}
+    while remaining:
+        for name in list(remaining):
+            job = remaining[name]
+            if any(d in remaining for d in job.depends_on):
+                continue
+            before = max(job.depends_on, key=lambda d: longest[d], default=None)
+            longest[name] = results.get(name, {}).get('duration', 0.0) + (longest[before] if before else 0.0)
+            previous[name] = before
+            del remaining[name]
+    if not longest:
+        return [], 0.0
+    name = max(longest, key=longest.get)
+    total = longest[name]
+    chain = []
+    while name:
+        chain.insert(0, name)
+        name = previous[name]
+    return chain, total
+# end critical_path
+
+
+# attempt to run code. if an error occurs, break to except statement
+if __name__ == '__main__':
+    # capture the date the script is being run
+    date_today = date.today()
+    # convert date format to month-day-year (1-1-2020)
+    formatted_date_today = date_today.strftime("%m-%d-%Y")
+    # placeholder for messages for text file
+    log_message = ''
+    # text file to write messages to; folder is updated from the jobs file
+    log_file = path.join(r'C:\GIS\Results', f'Job_Runner_Report_{formatted_date_today}.txt')
+    try:
+        if len(sys.argv) < 2:
+            raise ValueError('Usage: python job_runner.py <jobs file>')
+        # jobs file
+        config_file = path.abspath(sys.argv[1])
+        config = read_config(config_file)
+        settings = config.get('runner') or {}
+        log_file = path.join(settings.get('log_dir', r'C:\GIS\Results'), f'Job_Runner_Report_{formatted_date_today}.txt')
+        jobs = parse_jobs(config, path.dirname(config_file))
+
+        # add message
+        log_message += f"{time.strftime('%I:%M%p')} : Running {len(jobs)} jobs from {config_file}\n"
+
+        # add message for each job as it finishes
+        def log_result(result):
+            global log_message
+            log_message += f"\n{time.strftime('%I:%M%p')} : {result['name']} {result['status']} in {round(result['duration'] / 60, 2)}-minutes\n"
+            if result['error']:
+                log_message += f"\tError: {result['error']}\n"
+
+        job_results = run_jobs(jobs, settings.get('max_parallel', 2), settings.get('executor', 'process'), on_result=log_result)
+
+        # timing for the whole run
+        total_time = max((result['finish'] for result in job_results.values()), default=0.0)
+        busy_time = sum(result['duration'] for result in job_results.values())
+        chain, chain_time = critical_path(jobs, job_results)
+        completed = len([result for result in job_results.values() if result['status'] == 'completed'])
+        log_message += f"\nCompleted {completed} of {len(jobs)} jobs in {round(total_time / 60, 2)}-minutes ({round(busy_time / 60, 2)}-minutes of job time) on {formatted_date_today}\n"
+        log_message += f"Critical path: {' > '.join(chain)} ({round(chain_time / 60, 2)}-minutes)\n"
+        log_message += '\nJob timeline (minutes from start):\n'
+        for result in sorted(job_results.values(), key=lambda r: r['start']):
+            log_message += f"\t{result['name']:<30} {result['start'] / 60:8.2f} - {result['finish'] / 60:8.2f}  {result['status']}\n"
+    # If an error occurs capture error and write message
+    except (EnvironmentError, Exception) as e:
+        tbE = sys.exc_info()[2]
+        # add the line number the error occured to the log message
+        log_message += f"\nFailed at Line {tbE.tb_lineno}\n"
+        # add the error message to the log message
+        log_message += f"\nError: {str(e)}\n"
+    finally:
+        # write message to log file
+        try:
+            with open(log_file, 'w') as f:
+                f.write(str(log_message))
+        except:
+            pass
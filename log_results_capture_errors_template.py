@@ -15,6 +15,8 @@
 
 # Import system modules
 import arcpy
+import job_params
+import print_errors
 import sys
 import time
 from datetime import date
@@ -32,7 +34,7 @@ try:
     # Update file path with your parameters
     # Each time the script runs, it creates a new text file with the date1 variable as part of the file name
     # The example would be GeoprocessingReport_1-1-2017
-    log_file = path.join(r'C:\GIS\Results', f'Geoprocessing_Report_{formatted_date_today}.txt')
+    log_file = path.join(job_params.get_job_param('log_dir', r'C:\GIS\Results'), f'Geoprocessing_Report_{formatted_date_today}.txt')
 
     # variable to store messages for log file. Messages written in finally statement at end of script
     log_message = ''
@@ -41,6 +43,15 @@ try:
     start_time = time.perf_counter()
 
     # Put ArcPy geoprocessing code here
+    # when running a tool for each layer or row in a loop, gather errors with print_errors.ErrorCollector
+    # so one failure does not stop the loop, and repeats of an error are written once with a count, i.e.,
+    #     errors = print_errors.ErrorCollector()
+    #     for fc in feature_classes:
+    #         try:
+    #             arcpy.SomeTool_management(fc)
+    #         except Exception:
+    #             errors.add(context=fc)
+    #     log_message += errors.format()
 
     # add message for text file
     log_message += '\nAdd message about geoprocessing tool process completing\n'
@@ -59,8 +70,11 @@ except (Exception, EnvironmentError) as e:
     tbE = sys.exc_info()[2]
     # add the line number the error occured to the log message
     log_message += f"\nFailed at Line {tbE.tb_lineno}\n"
-    # add the error message to the log message
-    log_message += f"\nError: {str(e)}\n"
+    # add the error message, the errors that led to it, the traceback, and geoprocessing messages to the log message
+    # see print_errors.py
+    log_message += print_errors.capture_exception(e).format()
+    # tell the job runner the script failed (see job_runner.py)
+    job_params.report_job_failure(e)
 finally:
     # write message to log file
     try:
@@ -23,6 +23,7 @@
 
 # import modules
 import arcpy
+import job_params
 import sys
 import time
 from datetime import date
@@ -43,16 +44,16 @@ try:
     # variable to store messages for log file. Messages written in finally statement at end of script
     log_message = ''
     # Create text file for logging messages of script progress and/or errors
-    log_file = path.join(r'Path\To\Directory', f'Report File {formatted_date_today}.txt')
+    log_file = path.join(job_params.get_job_param('log_dir', r'Path\To\Directory'), f'Report File {formatted_date_today}.txt')
 
     # Set the path to the ArcGIS Pro project
     # this project contains the local dataset the feature service is being updated for
-    projPath = r'Path\To\Directory\ArcGIS_Pro_Project.aprx'
+    projPath = job_params.get_job_param('projPath', r'Path\To\Directory\ArcGIS_Pro_Project.aprx')
 
     # Feature service/SD name
     sd_fs_name = ""
     # service definition item ID
-    sd_id = ""
+    sd_id = job_params.get_job_param('sd_id', "")
     # ArcGIS Online or Portal URL
     portal = ""
     # user name of owner of item (admin users may be able to overwrite)
@@ -147,6 +148,8 @@ except (Exception, EnvironmentError) as e:
     log_message += f"\nFailed at Line {tbE.tb_lineno}\n"
     # Write the error message to the log file
     log_message += f"Error: {str(e)}"
+    # tell the job runner the script failed (see job_runner.py)
+    job_params.report_job_failure(e)
 finally:
     # write message to log file
     try:
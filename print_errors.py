@@ -4,15 +4,23 @@
 # Purpose:     Writes error messages that are returned from function.
 #              Messages can be written to log file or printed in the console.
 #
+#              capture_exception() keeps the whole chain of an error, the file and line
+#              of each step in the traceback, and any ArcPy geoprocessing error messages,
+#              but only turns them into text when format() is called.
+#              ErrorCollector gathers errors raised inside a loop (i.e., for each row
+#              or layer), counting repeats of the same error instead of storing each one.
+#
 # Author:      Patrick McKinney
 #
 # Created:     08/22/2019
 #
-# Updated:     9/21/2022
+# Updated:     10/19/2026
 #-------------------------------------------------------------------------------
 
+import re
 import sys
 import linecache
+import traceback
 
 # Function to handle errors
 def print_exception(error):
@@ -26,4 +34,119 @@ def print_exception(error):
     message = f'\nError: {error}\nFILE: {filename}, LINE: {lineno}\n\n\t "{line.strip()}": {exc_obj}'
     # return to variable
     return message
-# end PrintException
\ No newline at end of file
+# end PrintException
+
+
+# get file and line an error was raised from
+def error_location(error):
+    tb = error.__traceback__
+    if tb is None:
+        return '', 0
+    while tb.tb_next is not None:
+        tb = tb.tb_next
+    return tb.tb_frame.f_code.co_filename, tb.tb_lineno
+# end error_location
+
+
+# key used to find repeats of the same error
+# numbers are removed from the message so errors that only differ by ID (i.e., ObjectID 15 and 16) match
+def error_key(error):
+    message = re.sub(r'\d+', '#', str(error))[:200]
+    return (type(error).__name__, message) + error_location(error)
+# end error_key
+
+
+# Class to hold an error captured in an except statement
+# the error itself is not kept, so the variables in its traceback can be freed
+class CapturedError(object):
+    def __init__(self, error, context=None):
+        self.error_type = type(error).__name__
+        self.message = str(error)
+        # i.e., the name of the layer or row being processed when the error occured
+        self.context = context
+        # keep file, line, and function of each step in the traceback, including chained errors
+        # source lines are not read until the error is formatted
+        self.traceback = traceback.TracebackException(type(error), error, error.__traceback__, lookup_lines=False)
+        # geoprocessing error messages from the last tool that ran, if ArcPy is loaded
+        self.gp_messages = ''
+        arcpy = sys.modules.get('arcpy')
+        if arcpy is not None:
+            try:
+                self.gp_messages = arcpy.GetMessages(2)
+            except Exception:
+                pass
+        # file and line the error was raised from
+        self.filename, self.lineno = error_location(error)
+
+    # one line summary of error
+    def __str__(self):
+        return f'{self.error_type}: {self.message} (FILE: {self.filename}, LINE: {self.lineno})'
+
+    # full message with chained errors, traceback, and geoprocessing messages
+    def format(self):
+        message = f'\nError: {self.message}\n'
+        if self.context is not None:
+            message += f'While processing: {self.context}\n'
+        message += '\n' + ''.join(self.traceback.format())
+        if self.gp_messages:
+            message += f'\nGeoprocessing messages:\n{self.gp_messages}\n'
+        return message
+# end CapturedError
+
+
+# capture the error being handled in an except statement
+def capture_exception(error=None, context=None):
+    if error is None:
+        error = sys.exc_info()[1]
+    return CapturedError(error, context)
+# end capture_exception
+
+
+# Class to gather errors raised inside a loop
+# only the first max_errors different errors are kept; repeats of an error are counted
+class ErrorCollector(object):
+    def __init__(self, max_errors=50, max_contexts=5):
+        self.max_errors = max_errors
+        # number of contexts (i.e., row IDs) listed for each error
+        self.max_contexts = max_contexts
+        # key: [first captured error, count, contexts]
+        self.errors = {}
+        # errors not kept because max_errors was reached
+        self.dropped = 0
+        self.total = 0
+
+    # add the error being handled in an except statement
+    # repeats of an error are only counted, without capturing the traceback again
+    def add(self, error=None, context=None):
+        if error is None:
+            error = sys.exc_info()[1]
+        self.total += 1
+        key = error_key(error)
+        if key in self.errors:
+            entry = self.errors[key]
+            entry[1] += 1
+            if context is not None and len(entry[2]) < self.max_contexts:
+                entry[2].append(context)
+        elif len(self.errors) < self.max_errors:
+            self.errors[key] = [CapturedError(error, context), 1, [] if context is None else [context]]
+        else:
+            self.dropped += 1
+
+    def __len__(self):
+        return self.total
+
+    # message listing each different error once, with how many times it occured
+    def format(self):
+        if not self.total:
+            return ''
+        message = f'\n{self.total} errors ({len(self.errors)} different):\n'
+        for captured, count, contexts in self.errors.values():
+            message += f'\n{count} x {captured}\n'
+            if contexts:
+                more = ', ...' if count > len(contexts) else ''
+                message += f'\tWhile processing: {", ".join(str(c) for c in contexts)}{more}\n'
+            message += captured.format()
+        if self.dropped:
+            message += f'\n{self.dropped} more errors were not kept\n'
+        return message
+# end ErrorCollector
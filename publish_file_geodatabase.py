@@ -0,0 +1,130 @@
+#-------------------------------------------------------------------------------
+# Name:        Publish File Geodatabase Helper Module
+#
+# Purpose:     Publishes a file geodatabase kept on a local disk (i.e., a staging
+#              child replica) to one or more copies on network shares.
+#
+#              Each network copy has a spare copy next to it (name.gdb.spare).  Only the
+#              files that changed since the spare was last published are copied into the
+#              spare, several at a time.  The spare and the live copy are then swapped by
+#              renaming the folders, so readers never open a partly copied geodatabase.
+#              After the swap the old live copy becomes the spare for the next publish.
+#
+# Author:      Patrick McKinney
+#
+# Created:     10/19/2026
+#
+# Updated:     10/19/2026
+#-------------------------------------------------------------------------------
+
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from os import listdir
+from os import makedirs
+from os import path
+from os import remove
+from os import rename
+from os import stat
+
+# suffixes of the folders kept next to the live geodatabase
+SPARE_SUFFIX = '.spare'
+OLD_SUFFIX = '.old'
+
+
+# check if a file is a lock file written by ArcGIS while a geodatabase is open
+# lock files belong to the readers of one copy and are never copied
+def is_lock_file(file_name):
+    return file_name.lower().endswith('.lock')
+# end is_lock_file
+
+
+# check if a file in the destination matches the source by size and modified time
+def is_unchanged(source_file, destination_file):
+    if not path.exists(destination_file):
+        return False
+    source_stats = stat(source_file)
+    destination_stats = stat(destination_file)
+    # network shares can round modified times to 2 seconds
+    return source_stats.st_size == destination_stats.st_size and abs(source_stats.st_mtime - destination_stats.st_mtime) < 2
+# end is_unchanged
+
+
+# make destination folder match source folder, copying only changed files
+# returns count of files copied, bytes copied, and count of files deleted
+def mirror_folder(source, destination, max_workers=8):
+    makedirs(destination, exist_ok=True)
+    source_files = [f for f in listdir(source) if not is_lock_file(f) and path.isfile(path.join(source, f))]
+    changed = [f for f in source_files if not is_unchanged(path.join(source, f), path.join(destination, f))]
+
+    # copy changed files several at a time; copy2 keeps the modified time so unchanged files are skipped next time
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(lambda f: shutil.copy2(path.join(source, f), path.join(destination, f)), changed))
+    copied_bytes = sum(path.getsize(path.join(source, f)) for f in changed)
+
+    # remove files that no longer exist in source (i.e., a deleted feature class)
+    deleted = 0
+    for file_name in set(listdir(destination)) - set(source_files):
+        file_path = path.join(destination, file_name)
+        if path.isfile(file_path) and not is_lock_file(file_name):
+            remove(file_path)
+            deleted += 1
+    return len(changed), copied_bytes, deleted
+# end mirror_folder
+
+
+# swap spare folder in as the live geodatabase
+# the live folder is renamed out of the way, the spare is renamed to the live name,
+# and the old live folder becomes the spare
+def swap_folders(live, spare):
+    old = live + OLD_SUFFIX
+    if path.exists(old):
+        shutil.rmtree(old)
+    if path.exists(live):
+        # fails if a reader has the live geodatabase open on Windows; the live copy is left as it was
+        rename(live, old)
+    try:
+        rename(spare, live)
+    except OSError:
+        # put live copy back before passing the error on
+        if path.exists(old):
+            rename(old, live)
+        raise
+    if path.exists(old):
+        rename(old, spare)
+# end swap_folders
+
+
+# publish local geodatabase to a network geodatabase
+# returns dictionary with target, files copied, megabytes copied, files deleted, and time in seconds
+def publish(source_gdb, target_gdb, max_workers=8, swap_retries=3, retry_wait=30):
+    start_time = time.perf_counter()
+    spare = target_gdb + SPARE_SUFFIX
+    copied, copied_bytes, deleted = mirror_folder(source_gdb, spare, max_workers)
+
+    # readers can hold the live copy open for a short time; wait and try again
+    for attempt in range(swap_retries):
+        try:
+            swap_folders(target_gdb, spare)
+            break
+        except OSError:
+            if attempt == swap_retries - 1:
+                raise
+            time.sleep(retry_wait)
+    return {'target': target_gdb, 'copied': copied, 'megabytes': round(copied_bytes / 1048576, 2),
+            'deleted': deleted, 'duration': time.perf_counter() - start_time}
+# end publish
+
+
+# publish local geodatabase to several network geodatabases at the same time
+# returns list of result dictionaries from publish; a target that fails has an "error" in place of counts
+def publish_to_all(source_gdb, target_gdbs, max_workers=8):
+    def publish_one(target_gdb):
+        try:
+            return publish(source_gdb, target_gdb, max_workers)
+        except Exception as e:
+            return {'target': target_gdb, 'error': str(e)}
+
+    with ThreadPoolExecutor(max_workers=max(1, len(target_gdbs))) as executor:
+        return list(executor.map(publish_one, target_gdbs))
+# end publish_to_all
@@ -7,148 +7,326 @@
 #
 # Created:     9/2/2020
 #
-# Updated:     9/21/2022
+# Updated:     10/19/2026
 # -------------------------------------------------------------------------------------------------------------------
 
 # Import system modules
 import arcpy
+import job_params
+import change_watermark
+import edit_density
 import sys
+import grid_index
+import tile_math
+import tile_rebuild_scheduler
 import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import date
+from datetime import datetime
 from datetime import timedelta
+from functools import partial
 from os import path
 from os import environ
 
-try:
-    # get timestamp for starting processing
-    start_time = time.perf_counter()
-
-    # Name of service
-    service_name = 'Name of Service'
-
-    # date for the day the script is run on
-    date_today = date.today()
-    # Date formatted as month-day-year (1-1-2017)
-    formatted_date_today = date_today.strftime('%m-%d-%Y')
-    # date for how many days back you want to check for changes in a dataset
-    # change 8 to how many days back you want to check for changes
-    date_ago = date_today - timedelta(days=8)
-
-    # variable to store messages for log file. Messages written in finally statement at end of script
-    log_message = ''
-    # Create text file for logging results of script
-    log_file = path.join(r'C:\GIS\Logs', f'Rebuild Map Tiles Report {formatted_date_today}.txt')
-
-    # layer you want to check for changes in
-    # there needs to be a Date field that captures when edits occur
-    # ideally this would be an Editor Tracking field
-    # see https://pro.arcgis.com/en/pro-app/tool-reference/data-management/enable-editor-tracking.htm
-    reference_layer = r'C:\GIS\Data\reference_layer.shp'
-    # make feature layer so you can use the select by attributes function
-    ref_lyr_file = arcpy.MakeFeatureLayer_management(
-        reference_layer, 'My_Layer')
-
-    # SQL query clause
-    # the format for queries using date fields changes based upon your data's format
-    # read the docs > https://pro.arcgis.com/en/pro-app/help/mapping/navigation/sql-reference-for-elements-used-in-query-expressions.htm
-    # replace "last_edited_date" with whatever field represents the date last modiefied
-    where_clause = f"""last_edited_date >= date '{date_ago}' AND last_edited_date <= date '{date_today}'"""
-
-    # select features from reference layer that have been modified within your specified date range (i.e., within last week)
-    arcpy.SelectLayerByAttribute_management(
-        ref_lyr_file, 'NEW_SELECTION', where_clause)
-
-    # get count of features
-    count_selected_reference = arcpy.GetCount_management(ref_lyr_file)[0]
-    # verify records have been selected; if not, add message and exit script
-    if count_selected_reference == 0:
-        # add message
-        log_message += f'No "Reference Layer" records have been modified between {date_ago} and {date_today}\n'
-        # exit
-        sys.exit()
-
-    # grid layer that covers your area of interest (city, county, state, etc)
-    cache_grid_tiles = r'C:\GIS\Data\grids_layer.shp'
-    # make feature layer so you can select by location
-    cache_grid_tiles_lyr = arcpy.MakeFeatureLayer_management(
-        cache_grid_tiles, 'Grid_Tiles')
-
-    # select tile grids that intersect selected records from reference layer
-    arcpy.SelectLayerByLocation_management(
-        cache_grid_tiles_lyr, 'INTERSECT', ref_lyr_file)
-
-    # get count of features
-    count_selected_grids = arcpy.GetCount_management(cache_grid_tiles_lyr)[0]
-    # verify records have been selected; if not, add message and exit script
-    if count_selected_grids == 0:
-        # add message
-        log_message += f'No "Grid" features intersect "Reference Layer" records that have been modified between {date_ago} and {date_today}\n'
-        # exit
-        sys.exit()
-
-    # use selected records from grid tiles as area of interest for rebuilding cached map service tiles
-    area_of_interest_lyr = r'memory\selected_grids'
-    # copy selected features from grid layer to in memory
-    arcpy.CopyFeatures_management(cache_grid_tiles_lyr, area_of_interest_lyr)
-
-    # add message
-    log_message += f'Added selected "Grid" features to {area_of_interest_lyr}\n'
-    log_message += '\nSelected grids:\n\n'
-
-    # loop through Grid layer and list what records have been selected
-    # you can then use these as areas to check to verify your tiles have rebuilt the data
-    # replace 'LabelField' with a field in your Grid layer
-    with arcpy.da.SearchCursor(area_of_interest_lyr, 'LabelField') as cursor:
-        for row in cursor:
-            log_message += f'\t{row[0]}\n'
-
-    # create feature set object
-    # see https://pro.arcgis.com/en/pro-app/arcpy/classes/featureset.htm
-    feature_set = arcpy.FeatureSet()
-    # load selected records from Grid layer into feature set
-    feature_set.load(area_of_interest_lyr)
-
-    # ArcGIS Online or Portal URL
-    portal = ""
-    # user name of owner of item (admin users may be able to overwrite)
-    # create environment variable to store username; pass that variable name into get() method
-    user = environ.get('user_name_environment_variable')
-    # password of owner of item (admin users may be able to overwrite)
-    # create environment variable to store pasword; pass that variable name into get() method
-    password = environ.get('password_environment_variable')
-
-    # sign-in to Portal or ArcGIS Online
-    arcpy.SignInToPortal(portal, user, password)
-
-    # geoprocessing - rebuild map service cache tiles
-    # see https://pro.arcgis.com/en/pro-app/tool-reference/server/manage-map-server-cache-tiles.htm
-    # manually rebuilding the tiles for the service and copying the geoprocessing tool as a Python snippet
-    # can be used to get set this function
-    arcpy.server.ManageMapServerCacheTiles('service url', [
-                                           'scales to rebuild'], 'RECREATE_ALL_TILES', -1, feature_set, wait_for_job_completion='WAIT')
-
-    # get time stamp for end of processing
-    finish_time = time.perf_counter()
-    # time of processing in seconds
-    elapsed_time = finish_time - start_time
-    # time in minutes
-    elapsed_time_minutes = round((elapsed_time / 60), 2)
-    # time in hours
-    elapsed_time_hours = round((elapsed_time_minutes / 60), 2)
-
-    log_message += f'\n\nRebuilt cached tiles for {service_name} in {elapsed_time_hours}-hours on {formatted_date_today}\n'
-# If an error occurs running geoprocessing tool(s) capture error and write message
-# handle error outside of Python system
-except (Exception, EnvironmentError) as e:
-    tbE = sys.exc_info()[2]
-    # Write the line number the error occured to the log file
-    log_message += f'\nFailed at Line {tbE.tb_lineno}\n'
-    # Write the error message to the log file
-    log_message += f'Error: {str(e)}'
-finally:
-    # write message to log file
+# attempt to run code. if an error occurs, break to except statement
+# shards are rebuilt in separate processes, which import this script again; only run it when started directly
+if __name__ == '__main__':
     try:
-        with open(log_file, 'w') as f:
-            f.write(str(log_message))
-    except:
-        pass
\ No newline at end of file
+        # get timestamp for starting processing
+        start_time = time.perf_counter()
+
+        # Name of service
+        service_name = 'Name of Service'
+
+        # date for the day the script is run on
+        date_today = date.today()
+        # Date formatted as month-day-year (1-1-2017)
+        formatted_date_today = date_today.strftime('%m-%d-%Y')
+        # date for how many days back you want to check for changes in a dataset on the first run
+        # later runs check for changes made after the newest change processed by the last successful run
+        # change 8 to how many days back you want to check for changes
+        date_ago = date_today - timedelta(days=8)
+
+        # variable to store messages for log file. Messages written in finally statement at end of script
+        log_message = ''
+        # Create text file for logging results of script
+        log_file = path.join(job_params.get_job_param('log_dir', r'C:\GIS\Logs'), f'Rebuild Map Tiles Report {formatted_date_today}.txt')
+
+        # ArcGIS Online or Portal URL
+        portal = ""
+        # user name of owner of item (admin users may be able to overwrite)
+        # create environment variable to store username; pass that variable name into get() method
+        user = environ.get('user_name_environment_variable')
+        # password of owner of item (admin users may be able to overwrite)
+        # create environment variable to store pasword; pass that variable name into get() method
+        password = environ.get('password_environment_variable')
+
+        # sign-in to Portal or ArcGIS Online
+        arcpy.SignInToPortal(portal, user, password)
+
+        # URL of the cached map service
+        # i.e., https://server/arcgis/rest/services/MyService/MapServer
+        service_url = job_params.get_job_param('service_url', 'service url')
+        # scales to rebuild
+        # use the scale values from the map service's REST endpoint (i.e., [9027.977411, 4513.988705])
+        scales = ['scales to rebuild']
+        # how many pixels symbols and labels can draw past the edge of a feature
+        # tiles within this distance of a changed feature are rebuilt as well
+        pad_pixels = 32
+
+        # get origin, tile size, and levels of detail of the cache
+        # see tile_math.py
+        token = arcpy.GetSigninToken()
+        tiling_scheme = tile_math.get_tiling_scheme(service_url, token['token'] if token else None)
+        # spatial reference of the cache; changed features and grids are projected to this
+        cache_sr = arcpy.SpatialReference(tiling_scheme.wkid) if tiling_scheme.wkid else None
+
+        # layer you want to check for changes in
+        # there needs to be a Date field that captures when edits occur
+        # ideally this would be an Editor Tracking field
+        # see https://pro.arcgis.com/en/pro-app/tool-reference/data-management/enable-editor-tracking.htm
+        reference_layer = job_params.get_job_param('reference_layer', r'C:\GIS\Data\reference_layer.shp')
+
+        # replace "last_edited_date" with whatever field represents the date last modiefied
+        date_field = 'last_edited_date'
+
+        # file storing the newest edit date processed by the last successful rebuild
+        # see change_watermark.py
+        watermark_file = r'C:\GIS\Data\rebuild_map_tiles_watermark.json'
+        watermark = change_watermark.read_watermark(watermark_file)
+
+        # SQL query clause
+        # the format for queries using date fields changes based upon your data's format
+        # read the docs > https://pro.arcgis.com/en/pro-app/help/mapping/navigation/sql-reference-for-elements-used-in-query-expressions.htm
+        # shapefiles only store dates without times, so edits made on the day of the watermark are selected again
+        # use a geodatabase to select edits by time
+        dates_only = change_watermark.is_shapefile(reference_layer)
+
+        # file recording shards completed for the changes being processed
+        # see tile_rebuild_scheduler.py
+        checkpoint_file = r'C:\GIS\Data\rebuild_map_tiles_checkpoint.json'
+        if watermark:
+            where_clause = change_watermark.newer_than_clause(date_field, watermark, dates_only)
+            changes_since = watermark
+            checkpoint = tile_rebuild_scheduler.Checkpoint(checkpoint_file, f'{service_url}|{changes_since}')
+        else:
+            # the first run is identified without its start date, which moves forward each day;
+            # a rerun after a failure starts from the date stored in the checkpoint
+            checkpoint = tile_rebuild_scheduler.Checkpoint(checkpoint_file, f'{service_url}|first run')
+            if checkpoint.lower_bound is None:
+                checkpoint.lower_bound = str(date_ago)
+            changes_since = checkpoint.lower_bound
+            where_clause = f"""{date_field} >= date '{changes_since}'"""
+
+        # when the last run failed, select the same changes it was rebuilding, so the shards match and
+        # only the shards that did not complete are rebuilt; newer changes are rebuilt by the next run
+        if checkpoint.upper_bound:
+            upper_bound = datetime.strptime(checkpoint.upper_bound, change_watermark.DATE_FORMAT)
+            where_clause += ' AND ' + change_watermark.not_newer_than_clause(date_field, upper_bound, dates_only)
+            log_message += f'Resuming rebuild of changes made up to {upper_bound}; newer changes are rebuilt by the next run\n'
+
+        # get geometries and edit dates of features from reference layer that have been modified since the last run
+        # geometries are returned in the spatial reference of the cache
+        changed_geometries = []
+        edit_dates = []
+        with arcpy.da.SearchCursor(reference_layer, ['SHAPE@', date_field], where_clause, spatial_reference=cache_sr) as cursor:
+            for shape, edit_date in cursor:
+                edit_dates.append(edit_date)
+                if shape:
+                    changed_geometries.append(shape)
+        # newest edit within this run
+        # saved as the watermark once tiles are rebuilt
+        new_watermark = change_watermark.advance(watermark, edit_dates)
+
+        # verify records have been selected; if not, add message and exit script
+        if len(changed_geometries) == 0:
+            # add message
+            log_message += f'No "Reference Layer" records have been modified since {changes_since}\n'
+            # exit
+            sys.exit()
+
+        # store newest edit in the checkpoint, so a rerun after a failure selects the same changes
+        if checkpoint.upper_bound is None and new_watermark:
+            checkpoint.upper_bound = new_watermark.strftime(change_watermark.DATE_FORMAT)
+            checkpoint.save()
+
+        # grid layer that covers your area of interest (city, county, state, etc)
+        cache_grid_tiles = job_params.get_job_param('cache_grid_tiles', r'C:\GIS\Data\grids_layer.shp')
+        # spatial index of grid layer
+        # the index is rebuilt only when the grid layer or the spatial reference of the cache has changed since the last run
+        # see grid_index.py
+        grid_index_file = r'C:\GIS\Data\grids_layer_index.json'
+
+        # function to read the ID, label, and extent of each grid when the index needs rebuilding
+        # replace 'LabelField' with a field in your Grid layer
+        def read_grids():
+            with arcpy.da.SearchCursor(cache_grid_tiles, ['OID@', 'LabelField', 'SHAPE@'], spatial_reference=cache_sr) as cursor:
+                for oid, label, shape in cursor:
+                    yield oid, label, (shape.extent.XMin, shape.extent.YMin, shape.extent.XMax, shape.extent.YMax)
+
+        grids, rebuilt_index = grid_index.load_or_build(grid_index_file, cache_grid_tiles, read_grids, tiling_scheme.wkid)
+        if rebuilt_index:
+            # add message
+            log_message += f'Rebuilt spatial index {grid_index_file} for "Grid" layer\n'
+
+        # function to check whether a changed feature actually intersects a grid, as opposed to only its extent
+        def intersects_grid(number, grid_extent):
+            grid_polygon = arcpy.Extent(*grid_extent, spatial_reference=cache_sr).polygon
+            return not changed_geometries[number].disjoint(grid_polygon)
+
+        # get tile grids that intersect changed records from reference layer
+        changed_extents = [(g.extent.XMin, g.extent.YMin, g.extent.XMax, g.extent.YMax) for g in changed_geometries]
+        selected_grids = grids.query_many(changed_extents, intersects_grid)
+
+        # verify records have been selected; if not, add message and exit script
+        if len(selected_grids) == 0:
+            # add message
+            log_message += f'No "Grid" features intersect "Reference Layer" records that have been modified since {changes_since}\n'
+            # changes fall outside of the cache, so there is nothing to rebuild for them
+            change_watermark.save_watermark(watermark_file, new_watermark)
+            # exit
+            sys.exit()
+
+        # list what grids have been selected
+        # you can then use these as areas to check to verify your tiles have rebuilt the data
+        log_message += '\nSelected grids:\n\n'
+        for grid_id, label in selected_grids:
+            log_message += f'\t{label}\n'
+
+        # function to check whether a geometry actually touches a tile,
+        # as opposed to only its extent touching the tile
+        def make_tile_filter(geometry, scale):
+            tile_width, tile_height = tiling_scheme.tile_size(scale)
+            pad = pad_pixels * tiling_scheme.resolution_for_scale(scale)
+
+            def tile_filter(row, col):
+                xmin = tiling_scheme.origin_x + col * tile_width - pad
+                ymax = tiling_scheme.origin_y - row * tile_height + pad
+                tile_polygon = arcpy.Extent(xmin, ymax - tile_height - 2 * pad, xmin + tile_width + 2 * pad, ymax).polygon
+                return not geometry.disjoint(tile_polygon)
+            return tile_filter
+
+        # placeholder for tiles rebuilt
+        total_tiles = 0
+        log_message += '\nDirty tiles by scale:\n\n'
+
+        # extents to rebuild at each scale, and count of tiles in each extent
+        extents_by_scale = {}
+        tile_counts = {}
+        for scale in scales:
+            # set of (row, column) tiles touched by changed features at this scale
+            tiles = set()
+            for geometry in changed_geometries:
+                extent = geometry.extent
+                if geometry.type == 'point':
+                    # a point falls within one tile, so its extent is exact
+                    tiles |= tile_math.dirty_tiles([(extent.XMin, extent.YMin, extent.XMax, extent.YMax)],
+                                                   tiling_scheme, scale, pad_pixels)
+                elif geometry.type == 'multipoint':
+                    # the extent of a multipoint covers every tile between its points; use each point instead
+                    points = [geometry.getPart(number) for number in range(geometry.pointCount)]
+                    tiles |= tile_math.dirty_tiles([(point.X, point.Y, point.X, point.Y) for point in points],
+                                                   tiling_scheme, scale, pad_pixels)
+                else:
+                    tiles |= tile_math.dirty_tiles([(extent.XMin, extent.YMin, extent.XMax, extent.YMax)],
+                                                   tiling_scheme, scale, pad_pixels, make_tile_filter(geometry, scale))
+            # merge tiles into as few rectangles as possible
+            rectangles = tile_math.merge_tiles(tiles)
+            # add message
+            log_message += f'\t1:{scale} - {len(tiles)} tiles in {len(rectangles)} areas\n'
+            if not rectangles:
+                continue
+            total_tiles += len(tiles)
+            extents_by_scale[scale] = [tile_math.rectangle_extent(rect, tiling_scheme, scale) for rect in rectangles]
+            tile_counts[scale] = [(rect[2] - rect[0] + 1) * (rect[3] - rect[1] + 1) for rect in rectangles]
+
+        # split rebuild into shards by scale and region
+        # see tile_rebuild_scheduler.py
+        # list scales that are viewed most first (i.e., from your web server logs); by default smaller scales run first
+        scale_priority = []
+        # maximum number of tiles in one shard
+        max_tiles_per_shard = 5000
+        # number of shards rebuilt at the same time
+        # keep this at or below the number of instances of the CachingTools service
+        max_parallel_jobs = 2
+        # grid of recent edit counts (see edit_density.py); busier areas are rebuilt first within each scale
+        density_grid_file = job_params.get_job_param('density_grid', r'C:\GIS\Data\edit_density.npz')
+        region_weight = None
+        if path.exists(density_grid_file):
+            density_grid = edit_density.EditDensityGrid.load(density_grid_file)
+            if density_grid.wkid is None or tiling_scheme.wkid is None:
+                # add message
+                log_message += f'\nSpatial reference of {density_grid_file} or the cache is unknown; shards are not ordered by edit density\n'
+            elif density_grid.wkid == tiling_scheme.wkid:
+                region_weight = density_grid.weight_for_extent
+            else:
+                # project shard extents to the spatial reference of the grid before looking up edit counts
+                density_sr = arcpy.SpatialReference(density_grid.wkid)
+
+                def region_weight(extent):
+                    projected = arcpy.Extent(*extent, spatial_reference=cache_sr).polygon.projectAs(density_sr).extent
+                    return density_grid.weight_for_extent((projected.XMin, projected.YMin, projected.XMax, projected.YMax))
+        shards = tile_rebuild_scheduler.make_shards(extents_by_scale, max_tiles=max_tiles_per_shard,
+                                                    tile_counts=tile_counts, scale_priority=scale_priority,
+                                                    region_weight=region_weight)
+
+        # rebuild tiles of each shard in a separate process, since geoprocessing tools cannot run from several threads
+        # each process signs in to Portal or ArcGIS Online on its own
+        # see tile_rebuild_scheduler.rebuild_cache_shard()
+        rebuild_shard = partial(tile_rebuild_scheduler.rebuild_cache_shard, service_url, tiling_scheme.wkid)
+        executor = ProcessPoolExecutor(max_workers=max_parallel_jobs, initializer=tile_rebuild_scheduler.sign_in_worker,
+                                       initargs=(portal, user, password))
+
+        # add message for each shard as it finishes
+        shard_messages = []
+
+        def log_shard(result):
+            shard = result.shard
+            message = f'\t{time.strftime("%I:%M%p")} : 1:{shard.scale} - {shard.tile_count} tiles - {result.status} in {round(result.duration / 60, 2)}-minutes'
+            if result.error:
+                message += f' - Error: {result.error}'
+            shard_messages.append(message + '\n')
+
+        results = tile_rebuild_scheduler.run_shards(shards, rebuild_shard, checkpoint, max_parallel_jobs, log_shard, executor)
+        log_message += '\nShards:\n\n' + ''.join(shard_messages)
+
+        # verify every shard completed; if not, keep watermark so the next run resumes from the checkpoint
+        failed_shards = [result for result in results if result.status == 'failed']
+        if failed_shards:
+            for result in failed_shards:
+                log_message += result.error.format()
+            raise RuntimeError(f'{len(failed_shards)} of {len(shards)} shards failed to rebuild; run the script again to resume')
+
+        # all scales rebuilt; next run checks for changes made after the newest change processed here
+        change_watermark.save_watermark(watermark_file, new_watermark)
+        log_message += f'\nSaved newest processed edit date {new_watermark} to {watermark_file}\n'
+        # changes are processed, so shards do not need to be resumed
+        checkpoint.clear()
+
+        # get time stamp for end of processing
+        finish_time = time.perf_counter()
+        # time of processing in seconds
+        elapsed_time = finish_time - start_time
+        # time in minutes
+        elapsed_time_minutes = round((elapsed_time / 60), 2)
+        # time in hours
+        elapsed_time_hours = round((elapsed_time_minutes / 60), 2)
+
+        log_message += f'\n\nRebuilt {total_tiles} cached tiles for {service_name} in {elapsed_time_hours}-hours on {formatted_date_today}\n'
+    # If an error occurs running geoprocessing tool(s) capture error and write message
+    # handle error outside of Python system
+    except (Exception, EnvironmentError) as e:
+        tbE = sys.exc_info()[2]
+        # Write the line number the error occured to the log file
+        log_message += f'\nFailed at Line {tbE.tb_lineno}\n'
+        # Write the error message to the log file
+        log_message += f'Error: {str(e)}'
+        # tell the job runner the script failed (see job_runner.py)
+        job_params.report_job_failure(e)
+    finally:
+        # write message to log file
+        try:
+            with open(log_file, 'w') as f:
+                f.write(str(log_message))
+        except:
+            pass
\ No newline at end of file
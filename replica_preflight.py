@@ -0,0 +1,298 @@
+#-------------------------------------------------------------------------------
+# Name:        Replica Preflight Helper Module
+#
+# Purpose:     Estimates how many changes a replica would synchronize before running
+#              Synchronize Changes, and decides whether to skip the synchronization
+#              (nothing changed), run it, or rebuild the child geodatabase with a fresh
+#              copy of the data (more changes than it is worth synchronizing).
+#
+#              For versioned datasets, the states in the lineage of the replica's
+#              version are saved to a JSON file after each synchronization.  Changes
+#              are the rows in the delta tables (A and D tables) of the parent
+#              enterprise geodatabase for states added to the lineage since then.
+#              Datasets that are not versioned fall back to their Editor Tracking
+#              date field and the replica's last send date.  Editor Tracking does not
+#              record deleted rows, so these datasets never count as unchanged.  If
+#              neither is available the replica is always synchronized.
+#
+#              Skipping has to be safe, so the replica is synchronized whenever the
+#              estimate could miss edits: no lineage was saved yet, states were
+#              compressed since, or states created before the last send (i.e., from a
+#              long edit session or a named version) were posted to the version since.
+#
+#              The SQL is written for SQL Server and PostgreSQL geodatabases.
+#
+#              A rebuild creates the new replica into a separate file geodatabase
+#              first; the current replica and child are only replaced once that has
+#              succeeded.  A replica cannot be renamed, and its name cannot be reused
+#              while it is registered, so rebuilt replicas alternate between their name
+#              and their name with REBUILD_SUFFIX.
+#
+# Author:      Patrick McKinney
+#
+# Created:     10/19/2026
+#
+# Updated:     10/19/2026
+#-------------------------------------------------------------------------------
+
+import json
+import publish_file_geodatabase
+from datetime import timezone
+from os import path
+from os import replace
+
+# decisions
+SKIP = 'skip'
+SYNC = 'sync'
+REBUILD = 'rebuild'
+
+# added to the name of a replica and its child geodatabase while rebuilding
+REBUILD_SUFFIX = '_rebuild'
+# number of state IDs listed in one SQL query
+STATES_PER_QUERY = 1000
+
+
+# get replica from parent geodatabase by name
+# replica names are returned with the owner (i.e., GIS.Roads_Replica); either form can be used
+# a rebuilt replica is also found by its name with REBUILD_SUFFIX
+def get_replica(arcpy, parent, replica_name):
+    base_name = replica_name.split('.')[-1]
+    for replica in arcpy.da.ListReplicas(parent):
+        if replica.name == replica_name or replica.name.split('.')[-1] in (base_name, base_name + REBUILD_SUFFIX):
+            return replica
+    raise ValueError(f'Replica "{replica_name}" does not exist in {parent}')
+# end get_replica
+
+
+# get rows returned by ArcSDESQLExecute as a list of lists
+# execute returns True when no rows are selected, and a single value when one row and column are selected
+def _rows(result):
+    if result is None or result is True or result is False:
+        return []
+    if not isinstance(result, list):
+        return [[result]]
+    return result
+# end _rows
+
+
+# get the states in the lineage of a version, oldest first, and the IDs of those created at or before a date
+# version is the name of the version with its owner (i.e., sde.DEFAULT)
+# returns empty list and set if the version does not exist
+def get_version_lineage(sde_conn, version, since):
+    owner, name = version.split('.')[-2:] if '.' in version else ('', version)
+    # owners with a domain are quoted (i.e., "DOMAIN\\user".Edits)
+    owner = owner.strip('"').upper()
+    name = name.strip('"').upper()
+    rows = _rows(sde_conn.execute(
+        f"SELECT state_id FROM sde.sde_versions WHERE UPPER(owner) = '{owner}' AND UPPER(name) = '{name}'"))
+    if not rows:
+        return [], set()
+    state_id = int(rows[0][0])
+    rows = _rows(sde_conn.execute(
+        f"SELECT l.lineage_id, CASE WHEN s.creation_time <= '{since.strftime('%Y-%m-%d %H:%M:%S')}' THEN 1 ELSE 0 END "
+        f"FROM sde.sde_state_lineages l JOIN sde.sde_states s ON s.state_id = l.lineage_id "
+        f"WHERE l.lineage_name = (SELECT lineage_name FROM sde.sde_states WHERE state_id = {state_id}) AND l.lineage_id <= {state_id}"))
+    lineage = sorted(int(row[0]) for row in rows)
+    old_states = set(int(row[0]) for row in rows if int(row[1]) == 1)
+    return lineage, old_states
+# end get_version_lineage
+
+
+# read the states in the lineage of a replica's version saved at its last synchronization
+# returns None if none were saved
+def read_states(states_file):
+    if not states_file or not path.exists(states_file):
+        return None
+    with open(states_file) as f:
+        return json.load(f)['states']
+# end read_states
+
+
+# save the states in the lineage of a replica's version once it has been synchronized
+# file is written to a temporary name and then renamed so a failed write does not lose the previous states
+def save_states(states_file, states):
+    temp_file = f'{states_file}.tmp'
+    with open(temp_file, 'w') as f:
+        json.dump({'states': states}, f)
+    replace(temp_file, states_file)
+# end save_states
+
+
+# count rows in a dataset's delta tables that were added in a list of states
+# returns None if the dataset is not registered with the geodatabase
+def count_delta_rows(sde_conn, owner, table_name, state_ids):
+    rows = _rows(sde_conn.execute(
+        f"SELECT registration_id FROM sde.sde_table_registry WHERE UPPER(owner) = '{owner.upper()}' AND UPPER(table_name) = '{table_name.upper()}'"))
+    if not rows:
+        return None
+    registration_id = int(rows[0][0])
+    total = 0
+    for start in range(0, len(state_ids), STATES_PER_QUERY):
+        states = ', '.join(str(state_id) for state_id in state_ids[start:start + STATES_PER_QUERY])
+        for delta_table in (f'a{registration_id}', f'd{registration_id}'):
+            count = _rows(sde_conn.execute(f'SELECT COUNT(*) FROM {owner}.{delta_table} WHERE sde_state_id IN ({states})'))
+            total += int(count[0][0])
+    return total
+# end count_delta_rows
+
+
+# count rows in a dataset edited after a date using its Editor Tracking date field
+# since is in local time (i.e., the replica's lastSend); it is converted to UTC when the dataset stores edit dates in UTC
+# deleted rows leave no edit date, so a count of 0 does not mean nothing changed
+# returns None if Editor Tracking is not enabled or no edits were found
+def count_tracked_edits(arcpy, dataset_path, since):
+    desc = arcpy.Describe(dataset_path)
+    if not getattr(desc, 'editorTrackingEnabled', False) or not desc.editedAtFieldName:
+        return None
+    since_utc = since.astimezone(timezone.utc).replace(tzinfo=None)
+    if not hasattr(desc, 'isTimeInUTC'):
+        # time standard unknown; start from the earlier of the two so no edits are left out
+        since = min(since, since_utc)
+    elif desc.isTimeInUTC:
+        since = since_utc
+    where_clause = f"{desc.editedAtFieldName} > timestamp '{since.strftime('%Y-%m-%d %H:%M:%S')}'"
+    with arcpy.da.SearchCursor(dataset_path, ['OID@'], where_clause) as cursor:
+        count = sum(1 for row in cursor)
+    # only inserts and updates are counted; with none, the replica is synchronized in case rows were deleted
+    return count or None
+# end count_tracked_edits
+
+
+# estimate changes a replica would synchronize from the parent geodatabase
+# known_states are the states in the lineage of the replica's version at its last synchronization (see read_states())
+# rows in the parent are only counted when count_parent_rows is set (i.e., when rebuilding is allowed), since it reads every dataset
+# returns dictionary with:
+#   changes - dataset: estimated changes (None if unknown)
+#   parent_rows - total rows in parent datasets (None if not counted)
+#   states - states in the lineage of the replica's version now; save these once synchronized (None if unknown)
+#   warning - why edits may be missing from the estimate (None if there is no reason to think so)
+def estimate_changes(arcpy, parent, replica, known_states=None, count_parent_rows=False):
+    since = replica.lastSend or replica.creationDate
+    sde_conn = arcpy.ArcSDESQLExecute(parent)
+    estimate = {'changes': {}, 'parent_rows': 0 if count_parent_rows else None, 'states': None, 'warning': None}
+
+    # states added to the version since the last synchronization hold the edits the replica has not received yet
+    new_states = None
+    if since is not None:
+        lineage, old_states = get_version_lineage(sde_conn, replica.version, since)
+        if lineage:
+            estimate['states'] = lineage
+        if lineage and known_states is not None:
+            known_states = set(known_states)
+            new_states = [state_id for state_id in lineage if state_id not in known_states]
+            late_states = [state_id for state_id in new_states if state_id in old_states]
+            if known_states - set(lineage) or (lineage[-1] in known_states and lineage[-1] != max(known_states)):
+                # compress moves edits into other states or the base tables, where they cannot be told apart
+                estimate['warning'] = f'states of {replica.version} were compressed since last synchronization'
+            elif late_states:
+                estimate['warning'] = (f'{len(late_states)} states created before the last send were added to {replica.version} '
+                                       'since last synchronization')
+
+    for dataset in replica.datasets:
+        owner, table_name = dataset.split('.')[-2:] if '.' in dataset else ('', dataset)
+        dataset_path = path.join(parent, dataset)
+        if count_parent_rows:
+            estimate['parent_rows'] += int(arcpy.GetCount_management(dataset_path)[0])
+        count = None
+        if since is not None:
+            if getattr(arcpy.Describe(dataset_path), 'isVersioned', False):
+                if new_states is not None and owner:
+                    count = count_delta_rows(sde_conn, owner, table_name, new_states)
+            else:
+                count = count_tracked_edits(arcpy, dataset_path, since)
+        estimate['changes'][dataset] = count
+    return estimate
+# end estimate_changes
+
+
+# check if a replica can be rebuilt with the same definition
+# returns why it cannot be rebuilt, or None if it can
+# only one way replicas sent from the parent without a spatial filter are rebuilt;
+# note: attribute filters are not listed by arcpy.da.ListReplicas, so only allow rebuilding replicas without them
+def rebuild_problem(replica):
+    if replica.type != 'OneWay':
+        return f'replica type is {replica.type}; only one way replicas are rebuilt'
+    if not replica.isSender:
+        return 'parent does not send data to child'
+    if replica.geometry is not None:
+        return 'replica has a spatial filter'
+    return None
+# end rebuild_problem
+
+
+# decide whether to skip, synchronize, or rebuild a replica
+# estimate is returned by estimate_changes()
+# rebuild_ratio is how many changes, as a share of the rows in the parent, make a fresh copy faster than synchronizing
+# problem is why the replica cannot be rebuilt, if any (see rebuild_problem())
+# returns decision and a message explaining it
+def decide(estimate, rebuild_ratio=0.5, allow_rebuild=False, problem=None):
+    changes = estimate['changes']
+    parent_rows = estimate['parent_rows']
+    unknown = [dataset for dataset, count in changes.items() if count is None]
+    if unknown:
+        return SYNC, f'changes could not be estimated for {", ".join(unknown)}'
+    if estimate['warning']:
+        return SYNC, estimate['warning']
+    total = sum(changes.values())
+    if total == 0:
+        return SKIP, 'no changes in parent since last synchronization'
+    if allow_rebuild and parent_rows and total > rebuild_ratio * parent_rows:
+        if problem:
+            return SYNC, f'{total} estimated changes in {parent_rows} rows in parent; not rebuilt since {problem}'
+        return REBUILD, f'{total} estimated changes is more than {rebuild_ratio:.0%} of {parent_rows} rows in parent'
+    if parent_rows is None:
+        return SYNC, f'{total} estimated changes'
+    return SYNC, f'{total} estimated changes in {parent_rows} rows in parent'
+# end decide
+
+
+# unregister replicas with a name (without owner) from parent geodatabase
+def unregister_replicas(arcpy, parent, base_name):
+    for replica in arcpy.da.ListReplicas(parent):
+        if replica.name.split('.')[-1] == base_name:
+            arcpy.UnregisterReplica_management(parent, replica.name)
+# end unregister_replicas
+
+
+# replace child geodatabase with a fresh copy of the replica's data
+# the new replica is created into a separate file geodatabase (child name with REBUILD_SUFFIX) under the other name
+# (see REBUILD_SUFFIX); the current replica and child are left as they were if that fails
+# the new child is then swapped into place and the old replica is unregistered
+# returns name of new replica
+def rebuild_child(arcpy, parent, replica, child):
+    problem = rebuild_problem(replica)
+    if problem:
+        raise ValueError(f'Replica {replica.name} cannot be rebuilt; {problem}')
+    datasets = [path.join(parent, dataset) for dataset in replica.datasets]
+    base_name = replica.name.split('.')[-1]
+    new_name = base_name[:-len(REBUILD_SUFFIX)] if base_name.endswith(REBUILD_SUFFIX) else base_name + REBUILD_SUFFIX
+    new_child = path.splitext(child)[0] + REBUILD_SUFFIX + '.gdb'
+
+    # remove replica and geodatabase left by a failed rebuild
+    unregister_replicas(arcpy, parent, new_name)
+    if arcpy.Exists(new_child):
+        arcpy.Delete_management(new_child)
+
+    # build new child while the current replica is still in use
+    arcpy.CreateFileGDB_management(path.dirname(new_child), path.basename(new_child))
+    try:
+        arcpy.CreateReplica_management(datasets, 'ONE_WAY_REPLICA', new_child, new_name, 'FULL',
+                                       'PARENT_DATA_SENDER', 'USE_DEFAULTS', 'DO_NOT_REUSE', 'GET_RELATED')
+        # release locks held on the new child by this process
+        arcpy.ClearWorkspaceCache_management()
+        # the current child is moved to new_child; it is put back if the swap fails
+        publish_file_geodatabase.swap_folders(child, new_child)
+    except Exception:
+        unregister_replicas(arcpy, parent, new_name)
+        if arcpy.Exists(new_child):
+            arcpy.Delete_management(new_child)
+        raise
+
+    # new child is in place; remove the old replica and its child
+    try:
+        arcpy.UnregisterReplica_management(parent, replica.name)
+    except Exception as e:
+        raise RuntimeError(f'Rebuilt {child} as replica {new_name}, but could not unregister old replica {replica.name}; unregister it manually') from e
+    arcpy.Delete_management(new_child)
+    return new_name
+# end rebuild_child
@@ -10,10 +10,12 @@
 # Description: Synchronizes updates between a parent and child replica geodatabase in favor of the parent.
 # The parent geodatabase is a SDE enterprise geodatabase. The child is a file geodatabase
 # The script can be added as a windows scheduled task to automate replication updates on a weekly basis, for example.
+# To synchronize several replicas in one scheduled task, see sync_replicas.py
 # ---------------------------------------------------------------------------
 
 # Import system modules
 import arcpy
+import job_params
 import sys
 import time
 from datetime import date
@@ -29,22 +31,27 @@ try:
     log_message = ''
     # text file to write messages to
     # TODO: update path
-    log_file = path.join( r'C:\GIS\Results', f'Database_Maint_Report_{formatted_date_today}.txt' )
+    # settings can also be passed in by the job runner (see job_runner.py)
+    log_file = path.join(job_params.get_job_param('log_dir', r'C:\GIS\Results'), f'Database_Maint_Report_{formatted_date_today}.txt')
 
     # SDE is parent geodatabase in replication
     # TODO: update path for sde connection
-    sde = r"SDE Connection"
+    sde = job_params.get_job_param('sde', r"SDE Connection")
     # Child file geodatabase in replication
     # TODO: update path to file geodatabase
-    child_gdb = r"\\path\to\file.gdb"
+    child_gdb = job_params.get_job_param('child_gdb', r"\\path\to\file.gdb")
+    # name of the replication
+    # TODO: update the name of the replication
+    replica_name = job_params.get_job_param('replica_name', "Name of Replication")
 
     # Process: Synchronize Changes
     # Replicates data from parent to child geodatabase
-    # TODO: update the name of the replication
-    arcpy.SynchronizeChanges_management(sde, "Name of Replication", child_gdb, "FROM_GEODATABASE1_TO_2", "IN_FAVOR_OF_GDB1", "BY_OBJECT", "DO_NOT_RECONCILE")
+    arcpy.SynchronizeChanges_management(sde, replica_name, child_gdb, "FROM_GEODATABASE1_TO_2", "IN_FAVOR_OF_GDB1", "BY_OBJECT", "DO_NOT_RECONCILE")
 
     # add a more human readable message to log message
     log_message += f"\nSuccessfully ran replication from {sde} to {child_gdb} on {formatted_date_today}\n"
+    # pass child geodatabase to jobs that use it
+    job_params.set_job_output('child_gdb', child_gdb)
 # If an error occurs running geoprocessing tool(s) capture error and write message
 # handle error outside of Python system
 except (EnvironmentError, Exception) as e:
@@ -53,6 +60,8 @@ except (EnvironmentError, Exception) as e:
     log_message += f"\nFailed at Line {tbE.tb_lineno}\n"
     # add the error message to the log message
     log_message += f"\nError: {str(e)}\n"
+    # tell the job runner the script failed (see job_runner.py)
+    job_params.report_job_failure(e)
 finally:
     # write message to log file
     try:
@@ -0,0 +1,311 @@
+# ---------------------------------------------------------------------------
+# Name: Synchronize Multiple Replicas from SDE Enterprise Geodatabases
+#
+# Author: Patrick McKinney
+#
+# Created on: 10/19/2026
+#
+# Updated on: 10/19/2026
+#
+# Description: Synchronizes a list of replicas between parent SDE enterprise geodatabases
+# and child file geodatabases in favor of the parent, in place of keeping a copy of
+# sde_to_file_geodatabase_replica.py for each replica.
+# Replicas are listed in a JSON file.  Independent replicas are synchronized at the same time
+# in separate processes, with a limit on how many run against the same parent geodatabase.
+# A replica can list other replicas that must finish before it starts.
+# Before synchronizing, the changes waiting in the parent are estimated (see replica_preflight.py).
+# Replicas with no changes are skipped, and replicas that allow it are rebuilt with a fresh copy
+# when there are too many changes to synchronize quickly.
+# A replica can be synchronized into a staging file geodatabase on a local disk, which is much faster
+# than writing to a network share, and then published to one or more network shares (see publish_file_geodatabase.py).
+# The decision, time taken, and estimated changes for each replica are written to the log file.
+# The script can be added as a windows scheduled task to run the whole nightly replication batch.
+#
+# Example replicas file:
+# [
+#     {"name": "Roads_Replica", "parent": "C:\\GIS\\Connections\\gis.sde", "child": "\\\\server\\share\\roads.gdb"},
+#     {"name": "Parcels_Replica", "parent": "C:\\GIS\\Connections\\gis.sde", "child": "\\\\server\\share\\parcels.gdb",
+#      "depends_on": ["Roads_Replica"], "allow_rebuild": true, "rebuild_ratio": 0.5}
+# ]
+# Set "preflight" to false for a replica to always synchronize it without estimating changes.
+# Only set "allow_rebuild" for one way replicas without spatial or attribute filters; a rebuild copies every row
+# of the replica's datasets (see replica_preflight.rebuild_child()).
+# To synchronize into a local staging geodatabase, set "child" to the local geodatabase and list
+# the network geodatabases in "publish_to", i.e.,
+#     {"name": "Roads_Replica", "parent": "C:\\GIS\\Connections\\gis.sde", "child": "D:\\Staging\\roads.gdb",
+#      "publish_to": ["\\\\server1\\share\\roads.gdb", "\\\\server2\\share\\roads.gdb"]}
+# ---------------------------------------------------------------------------
+
+# Import system modules
+import job_params
+import json
+import print_errors
+import publish_file_geodatabase
+import replica_preflight
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import wait
+from datetime import date
+from os import path
+
+
+# read list of replicas from JSON file
+# each replica needs a "name", "parent" (sde connection file), and "child" (file geodatabase)
+# "depends_on" is an optional list of names of replicas that must finish first
+# "preflight", "allow_rebuild", and "rebuild_ratio" are optional settings for estimating changes before synchronizing
+# "states_file" is the JSON file the states of the replica's version are saved to after synchronizing (see replica_preflight.py);
+# by default it is saved next to the child (i.e., roads_states.json for roads.gdb)
+# "publish_to" is an optional list of network geodatabases the child is copied to after synchronizing
+def read_replicas(replicas_file):
+    with open(replicas_file) as f:
+        replicas = json.load(f)
+    for replica in replicas:
+        for key in ('name', 'parent', 'child'):
+            if key not in replica:
+                raise ValueError(f'Replica {replica} in {replicas_file} is missing "{key}"')
+        replica.setdefault('depends_on', [])
+        replica.setdefault('preflight', True)
+        replica.setdefault('allow_rebuild', False)
+        replica.setdefault('rebuild_ratio', 0.5)
+        replica.setdefault('states_file', path.splitext(replica['child'])[0] + '_states.json')
+        replica.setdefault('publish_to', [])
+    check_dependencies(replicas)
+    return replicas
+# end read_replicas
+
+
+# verify replica names are unique, dependencies exist, and there are no circular dependencies
+def check_dependencies(replicas):
+    names = [replica['name'] for replica in replicas]
+    if len(names) != len(set(names)):
+        raise ValueError('Replica names must be unique')
+    depends_on = {replica['name']: list(replica.get('depends_on', [])) for replica in replicas}
+    for name, dependencies in depends_on.items():
+        for dependency in dependencies:
+            if dependency not in depends_on:
+                raise ValueError(f'Replica "{name}" depends on unknown replica "{dependency}"')
+    # remove replicas with no remaining dependencies until none are left
+    remaining = dict(depends_on)
+    while remaining:
+        ready = [name for name, dependencies in remaining.items() if not set(dependencies) & set(remaining)]
+        if not ready:
+            raise ValueError(f'Circular dependency between replicas: {", ".join(sorted(remaining))}')
+        for name in ready:
+            del remaining[name]
+# end check_dependencies
+
+
+# copy local child geodatabase to network geodatabases and add results to replica result
+# a target that fails to publish marks the replica as failed
+def publish_child(child, targets, result):
+    published = publish_file_geodatabase.publish_to_all(child, targets)
+    result['published'] += published
+    errors = [f"{item['target']}: {item['error']}" for item in published if 'error' in item]
+    if errors:
+        result['status'] = 'failed'
+        result['error'] = 'Failed to publish to ' + '; '.join(errors)
+# end publish_child
+
+
+# synchronize one replica; runs in a separate process
+# arcpy is imported here so each process loads its own copy
+# returns dictionary with name, status, duration, action taken and why, estimated changes, and error
+# changes are the preflight estimates of rows added, updated, or deleted in each dataset (None if unknown);
+# rows are not counted after synchronizing, since that would read every dataset in the child again
+def sync_replica(replica):
+    start_time = time.perf_counter()
+    result = {'name': replica['name'], 'status': 'completed', 'duration': 0.0, 'changes': {}, 'error': None,
+              'action': replica_preflight.SYNC, 'reason': 'preflight turned off', 'published': []}
+    try:
+        import arcpy
+        parent = replica['parent']
+        child = replica['child']
+        # get replica from parent
+        parent_replica = replica_preflight.get_replica(arcpy, parent, replica['name'])
+
+        # estimate changes waiting in parent and decide whether to skip, synchronize, or rebuild
+        # rows in the parent are only counted when the replica can be rebuilt
+        estimate = None
+        states_file = replica.get('states_file') or path.splitext(child)[0] + '_states.json'
+        if replica.get('preflight', True):
+            allow_rebuild = replica.get('allow_rebuild', False)
+            estimate = replica_preflight.estimate_changes(arcpy, parent, parent_replica,
+                                                          replica_preflight.read_states(states_file), allow_rebuild)
+            result['changes'] = {dataset.split('.')[-1]: count for dataset, count in estimate['changes'].items()}
+            result['action'], result['reason'] = replica_preflight.decide(
+                estimate, replica.get('rebuild_ratio', 0.5), allow_rebuild, replica_preflight.rebuild_problem(parent_replica))
+        publish_to = replica.get('publish_to', [])
+        if result['action'] == replica_preflight.SKIP:
+            result['status'] = 'unchanged'
+            # publish staging geodatabase again, in case the last run failed to publish it to a network share
+            # only files that differ are copied, so this is quick when every share is up to date
+            if publish_to:
+                publish_child(child, publish_to, result)
+            # states added since last synchronization had no changes for this replica
+            if estimate['states'] and result['status'] != 'failed':
+                replica_preflight.save_states(states_file, estimate['states'])
+            result['duration'] = time.perf_counter() - start_time
+            return result
+
+        if result['action'] == replica_preflight.REBUILD:
+            # replace child with a fresh copy of the data
+            # the rebuilt replica alternates between the replica's name and its name with REBUILD_SUFFIX
+            result['replica'] = replica_preflight.rebuild_child(arcpy, parent, parent_replica, child)
+        else:
+            # Process: Synchronize Changes
+            # Replicates data from parent to child geodatabase
+            arcpy.SynchronizeChanges_management(parent, parent_replica.name, child, "FROM_GEODATABASE1_TO_2", "IN_FAVOR_OF_GDB1", "BY_OBJECT", "DO_NOT_RECONCILE")
+
+        # copy synchronized staging geodatabase to network shares
+        if publish_to:
+            publish_child(child, publish_to, result)
+
+        # the next preflight counts changes in states added to the version after these
+        # edits made while synchronizing are in states after these, so they are counted again (never missed)
+        # states are only saved once every network share has the changes; otherwise the next run synchronizes
+        # and publishes again instead of skipping
+        if estimate and estimate['states'] and result['status'] != 'failed':
+            replica_preflight.save_states(states_file, estimate['states'])
+    except Exception as e:
+        result['status'] = 'failed'
+        # include the traceback and geoprocessing messages, formatted here since the error cannot be sent between processes
+        result['error'] = print_errors.capture_exception(e).format()
+    result['duration'] = time.perf_counter() - start_time
+    return result
+# end sync_replica
+
+
+# run replicas in parallel, respecting dependencies
+# at most max_workers replicas run at once, and at most max_per_parent against the same parent geodatabase
+# replicas that depend on a replica that failed are skipped
+# replicas that are unchanged count as completed for replicas depending on them
+# worker and executor can be replaced (i.e., with a thread pool and fake worker) to check the scheduling
+# on_result is an optional function(result) called as each replica finishes
+# returns list of result dictionaries in the order replicas finished
+def run_replicas(replicas, max_workers=4, max_per_parent=2, worker=sync_replica, executor=None, on_result=None):
+    check_dependencies(replicas)
+    waiting = {replica['name']: replica for replica in replicas}
+    finished = {}
+    running = {}
+    parent_counts = {}
+    results = []
+
+    def record(result):
+        # a replica with nothing to synchronize is up to date, so replicas depending on it can run
+        finished[result['name']] = 'completed' if result['status'] == 'unchanged' else result['status']
+        results.append(result)
+        if on_result:
+            on_result(result)
+
+    executor = executor or ProcessPoolExecutor(max_workers=max_workers)
+    with executor:
+        while waiting or running:
+            # skip replicas whose dependencies did not complete
+            for name in list(waiting):
+                dependencies = waiting[name].get('depends_on', [])
+                if any(finished.get(d) in ('failed', 'skipped') for d in dependencies):
+                    del waiting[name]
+                    record({'name': name, 'status': 'skipped', 'duration': 0.0, 'changes': {},
+                            'error': 'A replica it depends on did not complete'})
+
+            # start replicas whose dependencies have completed, in the order they are listed
+            for name in list(waiting):
+                replica = waiting[name]
+                parent = replica['parent']
+                if len(running) >= max_workers or parent_counts.get(parent, 0) >= max_per_parent:
+                    continue
+                if all(finished.get(d) == 'completed' for d in replica.get('depends_on', [])):
+                    del waiting[name]
+                    running[executor.submit(worker, replica)] = replica
+                    parent_counts[parent] = parent_counts.get(parent, 0) + 1
+
+            if not running:
+                continue
+
+            # wait for a replica to finish before starting more
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in done:
+                replica = running.pop(future)
+                parent_counts[replica['parent']] -= 1
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # i.e., the worker process stopped unexpectedly
+                    result = {'name': replica['name'], 'status': 'failed', 'duration': 0.0, 'changes': {}, 'error': str(e)}
+                record(result)
+    return results
+# end run_replicas
+
+
+# attempt to run code. if an error occurs, break to except statement
+if __name__ == '__main__':
+    try:
+        # get time stamp for start of processing
+        start_time = time.perf_counter()
+        # capture the date the script is being run
+        date_today = date.today()
+        # convert date format to month-day-year (1-1-2020)
+        formatted_date_today = date_today.strftime("%m-%d-%Y")
+        # placeholder for messages for text file
+        log_message = ''
+        # text file to write messages to
+        # TODO: update path
+        log_file = path.join(job_params.get_job_param('log_dir', r'C:\GIS\Results'), f'Replication_Report_{formatted_date_today}.txt')
+
+        # JSON file listing replicas
+        # TODO: update path to replicas file
+        replicas_file = job_params.get_job_param('replicas_file', r'C:\GIS\Data\replicas.json')
+        replicas = read_replicas(replicas_file)
+        # maximum number of replicas to synchronize at the same time
+        max_workers = 4
+        # maximum number of replicas to synchronize at the same time against one parent geodatabase
+        max_per_parent = 2
+
+        # add message
+        log_message += f"{time.strftime('%I:%M%p')} : Synchronizing {len(replicas)} replicas from {replicas_file}\n"
+
+        # add message for each replica as it finishes
+        def log_result(result):
+            global log_message
+            log_message += f"\n{time.strftime('%I:%M%p')} : {result['name']} {result['status']} in {round(result['duration'] / 60, 2)}-minutes\n"
+            if result.get('action'):
+                log_message += f"\tDecision: {result['action']} - {result['reason']}\n"
+            if result.get('replica'):
+                log_message += f"\tRebuilt as replica {result['replica']}\n"
+            for dataset, change in result['changes'].items():
+                log_message += f"\t{dataset}: {'unknown' if change is None else change} changes (estimated)\n"
+            for item in result.get('published', []):
+                if 'error' not in item:
+                    log_message += f"\tPublished to {item['target']}: {item['copied']} files ({item['megabytes']} MB) copied, {item['deleted']} deleted in {round(item['duration'], 1)} seconds\n"
+            if result['error']:
+                log_message += f"\tError: {result['error']}\n"
+
+        results = run_replicas(replicas, max_workers, max_per_parent, on_result=log_result)
+
+        # get time stamp for end of processing
+        finish_time = time.perf_counter()
+        # time in minutes
+        elapsed_time_minutes = round(((finish_time - start_time) / 60), 2)
+        completed = len([result for result in results if result['status'] == 'completed'])
+        unchanged = len([result for result in results if result['status'] == 'unchanged'])
+        # add a more human readable message to log message
+        log_message += f"\nSynchronized {completed} of {len(replicas)} replicas ({unchanged} had no changes) in {elapsed_time_minutes}-minutes on {formatted_date_today}\n"
+    # If an error occurs running geoprocessing tool(s) capture error and write message
+    # handle error outside of Python system
+    except (EnvironmentError, Exception) as e:
+        tbE = sys.exc_info()[2]
+        # add the line number the error occured to the log message
+        log_message += f"\nFailed at Line {tbE.tb_lineno}\n"
+        # add the error message to the log message
+        log_message += f"\nError: {str(e)}\n"
+        # tell the job runner the script failed (see job_runner.py)
+        job_params.report_job_failure(e)
+    finally:
+        # write message to log file
+        try:
+            with open(log_file, 'w') as f:
+                f.write(str(log_message))
+        except:
+            pass
@@ -0,0 +1,6 @@
+# helper modules sit at the top of the repository rather than in a package,
+# so add the repository folder to the import path for the tests
+import sys
+from os import path
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
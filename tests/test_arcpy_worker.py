@@ -0,0 +1,33 @@
+# Tests for running jobs in the worker process of arcpy_worker.py (without arcpy)
+
+import sys
+
+import arcpy_worker
+
+
+# write a script and a helper module it imports into a folder
+def make_job(folder, value):
+    folder.mkdir()
+    (folder / 'job_helper.py').write_text(f'VALUE = {value!r}\n')
+    (folder / 'job.py').write_text('import job_helper\nimport decimal\nprint(job_helper.VALUE)\n')
+    return {'script': str(folder / 'job.py')}
+
+
+def test_job_modules_are_not_reused(tmp_path):
+    first = arcpy_worker.run_job(make_job(tmp_path / 'first', 'first'))
+    second = arcpy_worker.run_job(make_job(tmp_path / 'second', 'second'))
+    assert first['output'].strip() == 'first'
+    assert second['output'].strip() == 'second'
+    assert 'job_helper' not in sys.modules
+    # modules installed with Python are kept
+    assert 'decimal' in sys.modules
+
+
+def test_failed_job_restores_state(tmp_path):
+    folder = tmp_path / 'job'
+    folder.mkdir()
+    (folder / 'job.py').write_text('import sys\nsys.argv.append("changed")\nraise SystemExit(2)\n')
+    saved_path = list(sys.path)
+    result = arcpy_worker.run_job({'script': str(folder / 'job.py'), 'args': ['one']})
+    assert result['status'] == 'failed' and result['exit_code'] == 2
+    assert sys.path == saved_path
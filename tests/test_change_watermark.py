@@ -0,0 +1,73 @@
+# Tests for the SQL clauses and watermark file of change_watermark.py
+
+from datetime import datetime
+
+import change_watermark
+
+
+def test_newer_than_clause_rounds_down_to_the_millisecond():
+    watermark = datetime(2026, 10, 19, 8, 30, 15, 123456)
+    assert change_watermark.newer_than_clause('last_edited_date', watermark) == \
+        "last_edited_date >= timestamp '2026-10-19 08:30:15.123'"
+
+
+def test_newer_than_clause_whole_second():
+    watermark = datetime(2026, 10, 19, 8, 30, 15)
+    assert change_watermark.newer_than_clause('last_edited_date', watermark) == \
+        "last_edited_date >= timestamp '2026-10-19 08:30:15'"
+    watermark = datetime(2026, 10, 19, 8, 30, 15, 999)
+    assert change_watermark.newer_than_clause('last_edited_date', watermark) == \
+        "last_edited_date >= timestamp '2026-10-19 08:30:15'"
+
+
+def test_not_newer_than_clause_includes_the_upper_bound():
+    upper_bound = datetime(2026, 10, 19, 8, 30, 15, 123456)
+    assert change_watermark.not_newer_than_clause('last_edited_date', upper_bound) == \
+        "last_edited_date < timestamp '2026-10-19 08:30:15.124'"
+    upper_bound = datetime(2026, 12, 31, 23, 59, 59, 999500)
+    assert change_watermark.not_newer_than_clause('last_edited_date', upper_bound) == \
+        "last_edited_date < timestamp '2027-01-01 00:00:00'"
+
+
+def test_shapefile_clauses_select_whole_days():
+    watermark = datetime(2026, 10, 19, 8, 30, 15, 123456)
+    assert change_watermark.newer_than_clause('EditDate', watermark, True) == "EditDate >= date '2026-10-19'"
+    assert change_watermark.not_newer_than_clause('EditDate', watermark, True) == "EditDate <= date '2026-10-19'"
+
+
+# evaluate a clause built by change_watermark against a date stored with microseconds
+def selects(clause, value):
+    field, operator, keyword, literal = clause.split(' ', 3)
+    literal = literal.strip("'")
+    bound = datetime.strptime(literal, '%Y-%m-%d %H:%M:%S.%f' if '.' in literal else '%Y-%m-%d %H:%M:%S')
+    return value >= bound if operator == '>=' else value < bound
+
+
+def test_clauses_do_not_skip_edits():
+    watermark = datetime(2026, 10, 19, 8, 30, 15, 123456)
+    newer = change_watermark.newer_than_clause('d', watermark)
+    not_newer = change_watermark.not_newer_than_clause('d', watermark)
+    # edit later within the watermark's millisecond
+    assert selects(newer, datetime(2026, 10, 19, 8, 30, 15, 123800))
+    assert selects(newer, datetime(2026, 10, 19, 8, 30, 15, 124000))
+    assert not selects(newer, datetime(2026, 10, 19, 8, 30, 15, 122999))
+    # every edit is selected by at least one of the clauses
+    for microsecond in range(120000, 128000, 100):
+        value = datetime(2026, 10, 19, 8, 30, 15, microsecond)
+        assert selects(newer, value) or selects(not_newer, value)
+    assert selects(not_newer, watermark)
+
+
+def test_save_and_read_watermark(tmp_path):
+    watermark_file = str(tmp_path / 'watermark.json')
+    assert change_watermark.read_watermark(watermark_file) is None
+    watermark = datetime(2026, 10, 19, 8, 30, 15, 123456)
+    change_watermark.save_watermark(watermark_file, watermark)
+    assert change_watermark.read_watermark(watermark_file) == watermark
+
+
+def test_advance():
+    watermark = datetime(2026, 10, 18)
+    assert change_watermark.advance(watermark, [None, datetime(2026, 10, 17)]) == watermark
+    assert change_watermark.advance(watermark, [datetime(2026, 10, 19)]) == datetime(2026, 10, 19)
+    assert change_watermark.advance(None, []) is None
@@ -0,0 +1,82 @@
+# Tests for updating the edit density grid in edit_density.py, using a fake arcpy
+
+from datetime import datetime
+
+import numpy as np
+
+import edit_density
+
+
+# stands in for arcpy; holds the edits of one layer and applies the watermark clause when they are read
+class FakeArcpy(object):
+    def __init__(self, date_field, wkid=3857):
+        self.date_field = date_field
+        self.edits = []
+        self.spatialReference = type('SpatialReference', (), {'factoryCode': wkid})
+        self.da = self
+
+    def Describe(self, layer):
+        return self
+
+    def add_edit(self, oid, x, y, edit_date):
+        self.edits.append((oid, x, y, edit_date))
+
+    # only the clauses written by change_watermark.newer_than_clause() are understood
+    def FeatureClassToNumPyArray(self, layer, fields, where_clause, spatial_reference, skip_nulls=False):
+        selected = self.edits
+        if where_clause:
+            field, operator, keyword, literal = where_clause.split(' ', 3)
+            assert field == self.date_field and operator == '>='
+            start = np.datetime64(literal.strip("'"))
+            selected = [edit for edit in self.edits if np.datetime64(edit[3]) >= start]
+        return np.array(selected, dtype=[('OID@', 'int32'), ('SHAPE@X', 'float64'), ('SHAPE@Y', 'float64'),
+                                         (self.date_field, 'datetime64[us]')])
+
+
+def make_grid():
+    return edit_density.EditDensityGrid.from_extent(0, 0, 100, 100, 10)
+
+
+def test_shapefile_edits_are_counted_once(tmp_path):
+    arcpy = FakeArcpy('EditDate')
+    arcpy.add_edit(1, 5, 5, datetime(2026, 10, 18))
+    arcpy.add_edit(2, 15, 5, datetime(2026, 10, 19))
+    arcpy.add_edit(3, 25, 5, datetime(2026, 10, 19))
+    grid = make_grid()
+    now = datetime(2026, 10, 19, 20)
+    assert edit_density.update_from_layer(arcpy, grid, 'edits.shp', 'EditDate', now=now) == 3
+    assert grid.watermark == datetime(2026, 10, 19)
+
+    # no new edits; the watermark's day is selected again, but nothing is counted twice
+    for run in range(2):
+        grid_file = str(tmp_path / 'grid.npz')
+        grid.save(grid_file)
+        grid = edit_density.EditDensityGrid.load(grid_file)
+        assert edit_density.update_from_layer(arcpy, grid, 'edits.shp', 'EditDate', now=now) == 0
+        assert grid.counts.sum() == 3
+
+    # new edit made later on the same day
+    arcpy.add_edit(4, 35, 5, datetime(2026, 10, 19))
+    assert edit_density.update_from_layer(arcpy, grid, 'edits.shp', 'EditDate', now=now) == 1
+    assert grid.counts.sum() == 4
+    assert sorted(grid.counted.tolist()) == [2, 3, 4]
+
+    # edits on the next day
+    arcpy.add_edit(2, 15, 5, datetime(2026, 10, 20))
+    assert edit_density.update_from_layer(arcpy, grid, 'edits.shp', 'EditDate', now=now) == 1
+    assert grid.counted.tolist() == [2]
+
+
+def test_geodatabase_edits_in_the_watermarks_millisecond_are_counted_once():
+    arcpy = FakeArcpy('last_edited_date')
+    arcpy.add_edit(1, 5, 5, datetime(2026, 10, 19, 8, 30, 15, 123456))
+    grid = make_grid()
+    now = datetime(2026, 10, 19, 20)
+    assert edit_density.update_from_layer(arcpy, grid, 'edits', 'last_edited_date', now=now) == 1
+    assert edit_density.update_from_layer(arcpy, grid, 'edits', 'last_edited_date', now=now) == 0
+
+    # edit later within the same millisecond is not skipped
+    arcpy.add_edit(2, 15, 5, datetime(2026, 10, 19, 8, 30, 15, 123800))
+    assert edit_density.update_from_layer(arcpy, grid, 'edits', 'last_edited_date', now=now) == 1
+    assert edit_density.update_from_layer(arcpy, grid, 'edits', 'last_edited_date', now=now) == 0
+    assert grid.counts.sum() == 2
@@ -0,0 +1,132 @@
+# Tests for grid_index.py using synthetic grids and a shapefile made of empty files
+
+import random
+import time
+
+import grid_index
+
+
+# grid of square cells; records are (grid_id, label, (xmin, ymin, xmax, ymax))
+def make_records(rows=20, cols=30, size=100.0):
+    records = []
+    for row in range(rows):
+        for col in range(cols):
+            grid_id = row * cols + col + 1
+            records.append((grid_id, f'R{row}C{col}', (col * size, row * size, (col + 1) * size, (row + 1) * size)))
+    return records
+
+
+# grid IDs found by checking every record
+def brute_force(records, extents, refine=None):
+    selected = set()
+    for number, extent in enumerate(extents):
+        for grid_id, label, grid_extent in records:
+            if grid_index.extents_intersect(grid_extent, extent) and (refine is None or refine(number, list(grid_extent))):
+                selected.add(grid_id)
+    return sorted(selected)
+
+
+# grid ID of the record with a label
+def grid_index_id(records, label):
+    return [grid_id for grid_id, record_label, extent in records if record_label == label][0]
+
+
+# write empty files standing in for a shapefile
+def make_shapefile(folder, name='grids'):
+    for extension in grid_index.SHAPEFILE_EXTENSIONS:
+        (folder / f'{name}{extension}').write_bytes(b'0')
+    return str(folder / f'{name}.shp')
+
+
+def test_query_many_matches_brute_force():
+    records = make_records()
+    index = grid_index.GridIndex.from_records(records)
+    generator = random.Random(7)
+    extents = []
+    for number in range(200):
+        x = generator.uniform(-200, 3200)
+        y = generator.uniform(-200, 2200)
+        extents.append((x, y, x + generator.uniform(0, 400), y + generator.uniform(0, 400)))
+    selected = index.query_many(extents)
+    assert [grid_id for grid_id, label in selected] == brute_force(records, extents)
+
+
+def test_query_many_with_refine_matches_brute_force():
+    records = make_records()
+    index = grid_index.GridIndex.from_records(records)
+    extents = [(150, 150, 950, 350), (2950, 1950, 3050, 2050)]
+
+    # keep grids whose lower left corner is within the extent
+    def refine(number, grid_extent):
+        extent = extents[number]
+        return extent[0] <= grid_extent[0] <= extent[2] and extent[1] <= grid_extent[1] <= extent[3]
+
+    selected = index.query_many(extents, refine)
+    assert [grid_id for grid_id, label in selected] == brute_force(records, extents, refine)
+    assert dict(selected)[grid_index_id(records, 'R2C2')] == 'R2C2'
+
+
+def test_empty_index():
+    index = grid_index.GridIndex.from_records([])
+    assert index.query_many([(0, 0, 10, 10)]) == []
+
+
+def test_save_and_load(tmp_path):
+    records = make_records(5, 5)
+    index = grid_index.GridIndex.from_records(records, ['signature'])
+    index.save(str(tmp_path / 'index.json'))
+    loaded = grid_index.GridIndex.load(str(tmp_path / 'index.json'))
+    assert loaded.signature == ['signature']
+    assert loaded.query_many([(0, 0, 250, 250)]) == index.query_many([(0, 0, 250, 250)])
+
+
+def test_load_or_build_only_rebuilds_on_change(tmp_path):
+    grid_layer = make_shapefile(tmp_path)
+    index_file = str(tmp_path / 'index.json')
+    reads = []
+
+    def read_records():
+        reads.append(1)
+        return make_records(3, 3)
+
+    index, rebuilt = grid_index.load_or_build(index_file, grid_layer, read_records, 3857)
+    assert rebuilt and len(reads) == 1
+    index, rebuilt = grid_index.load_or_build(index_file, grid_layer, read_records, 3857)
+    assert not rebuilt and len(reads) == 1
+    assert len(index.query_many([(0, 0, 300, 300)])) == 9
+
+    # spatial reference of the extents changed
+    index, rebuilt = grid_index.load_or_build(index_file, grid_layer, read_records, 2272)
+    assert rebuilt
+
+    # grid layer edited
+    time.sleep(0.05)
+    (tmp_path / 'grids.dbf').write_bytes(b'00')
+    index, rebuilt = grid_index.load_or_build(index_file, grid_layer, read_records, 2272)
+    assert rebuilt
+
+    # different grid layer with the same files
+    other_layer = make_shapefile(tmp_path, 'other_grids')
+    index, rebuilt = grid_index.load_or_build(index_file, other_layer, read_records, 2272)
+    assert rebuilt
+    assert len(reads) == 4
+
+
+def test_load_or_build_rebuilds_when_files_are_missing(tmp_path):
+    index_file = str(tmp_path / 'index.json')
+    missing_layer = str(tmp_path / 'missing.gdb' / 'Grids')
+    grid_index.load_or_build(index_file, missing_layer, lambda: make_records(2, 2))
+    index, rebuilt = grid_index.load_or_build(index_file, missing_layer, lambda: make_records(2, 2))
+    assert rebuilt
+
+
+def test_source_signature_of_file_geodatabase(tmp_path):
+    gdb = tmp_path / 'Data.gdb'
+    gdb.mkdir()
+    (gdb / 'a00000009.gdbtable').write_bytes(b'0')
+    # feature class within a feature dataset has no file of its own
+    signature = grid_index.source_signature(str(gdb / 'Dataset' / 'Grids'))
+    assert signature
+    time.sleep(0.05)
+    (gdb / 'a00000009.gdbtable').write_bytes(b'00')
+    assert grid_index.source_signature(str(gdb / 'Grids')) != signature
@@ -0,0 +1,137 @@
+# Tests for scheduling jobs in job_runner.py using a fake runner in place of running scripts
+
+import threading
+import time
+
+import pytest
+
+import job_runner
+from job_runner import Job
+
+
+# stands in for run_job(); each job takes a short time, records what ran at the same time,
+# and returns the outputs and status it is given
+class FakeRunner(object):
+    def __init__(self, outputs=None, failing=(), duration=0.05):
+        self.outputs = outputs or {}
+        self.failing = set(failing)
+        self.duration = duration
+        self.lock = threading.Lock()
+        self.started = []
+        self.params = {}
+        self.running = []
+        self.most_running = 0
+        self.most_in_worker = 0
+
+    def __call__(self, job, params, default_executor, run_start):
+        start = time.perf_counter() - run_start
+        with self.lock:
+            self.started.append(job.name)
+            self.params[job.name] = params
+            self.running.append(job)
+            self.most_running = max(self.most_running, len(self.running))
+            in_worker = [j for j in self.running if (j.executor or default_executor) == 'worker']
+            self.most_in_worker = max(self.most_in_worker, len(in_worker))
+        time.sleep(self.duration)
+        with self.lock:
+            self.running.remove(job)
+        finish = time.perf_counter() - run_start
+        failed = job.name in self.failing
+        return {'name': job.name, 'status': 'failed' if failed else 'completed', 'start': start, 'finish': finish,
+                'duration': finish - start, 'outputs': self.outputs.get(job.name, {}), 'error': 'failed' if failed else None}
+
+
+def test_dependencies_run_first_within_parallel_limit():
+    jobs = [Job('export', 'export.py', ['replica', 'maintenance']), Job('replica', 'replica.py'),
+            Job('maintenance', 'maintenance.py'), Job('tiles', 'tiles.py'), Job('report', 'report.py', ['export'])]
+    runner = FakeRunner()
+    results = job_runner.run_jobs(jobs, max_parallel=2, runner=runner)
+    assert runner.most_running == 2
+    order = runner.started
+    assert order.index('export') > max(order.index('replica'), order.index('maintenance'))
+    assert order.index('report') > order.index('export')
+    assert all(result['status'] == 'completed' for result in results.values())
+    assert results['report']['start'] >= results['export']['finish']
+
+
+def test_failed_job_skips_dependents():
+    jobs = [Job('replica', 'replica.py'), Job('export', 'export.py', ['replica']), Job('report', 'report.py', ['export']),
+            Job('tiles', 'tiles.py')]
+    runner = FakeRunner(failing=['replica'])
+    results = job_runner.run_jobs(jobs, runner=runner)
+    assert {name: result['status'] for name, result in results.items()} == \
+        {'replica': 'failed', 'export': 'skipped', 'report': 'skipped', 'tiles': 'completed'}
+    assert sorted(runner.started) == ['replica', 'tiles']
+
+
+def test_outputs_are_passed_to_dependents():
+    jobs = [Job('replica', 'replica.py'),
+            Job('export', 'export.py', ['replica'], {'geodatabase': '${jobs.replica.outputs.child_gdb}',
+                                                       'report': 'Exported ${jobs.replica.outputs.count} rows',
+                                                       'layers': '${jobs.replica.outputs.layers}'})]
+    runner = FakeRunner({'replica': {'child_gdb': r'\\server\share\file.gdb', 'count': 12, 'layers': ['Roads', 'Parcels']}})
+    results = job_runner.run_jobs(jobs, runner=runner)
+    assert results['export']['status'] == 'completed'
+    assert runner.params['export'] == {'geodatabase': r'\\server\share\file.gdb', 'report': 'Exported 12 rows',
+                                       'layers': ['Roads', 'Parcels']}
+
+
+def test_missing_output_fails_job():
+    jobs = [Job('replica', 'replica.py'), Job('export', 'export.py', ['replica'], {'geodatabase': '${jobs.replica.outputs.child_gdb}'}),
+            Job('report', 'report.py', ['export'])]
+    runner = FakeRunner()
+    results = job_runner.run_jobs(jobs, runner=runner)
+    assert results['export']['status'] == 'failed'
+    assert 'did not output "child_gdb"' in results['export']['error']
+    assert results['report']['status'] == 'skipped'
+    assert runner.started == ['replica']
+
+
+def test_one_worker_job_at_a_time():
+    jobs = [Job(f'worker{number}', 'job.py', executor='worker') for number in range(3)] + \
+           [Job(f'process{number}', 'job.py', executor='process') for number in range(2)]
+    runner = FakeRunner()
+    results = job_runner.run_jobs(jobs, max_parallel=3, runner=runner)
+    assert runner.most_in_worker == 1
+    assert runner.most_running == 3
+    assert len(results) == 5
+
+
+def test_run_job_holds_worker_lock(monkeypatch):
+    running = []
+    most_running = []
+
+    def run_in_worker(job, env):
+        running.append(job.name)
+        most_running.append(len(running))
+        time.sleep(0.05)
+        running.remove(job.name)
+        return 0, None
+
+    monkeypatch.setattr(job_runner, 'run_in_worker', run_in_worker)
+    jobs = [Job(f'worker{number}', 'job.py') for number in range(3)]
+    threads = [threading.Thread(target=job_runner.run_job, args=(job, {}, 'worker', time.perf_counter())) for job in jobs]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert max(most_running) == 1
+
+
+def test_worker_job_with_timeout_is_rejected():
+    with pytest.raises(ValueError):
+        job_runner.check_jobs([Job('tiles', 'tiles.py', timeout=60)], 'worker')
+
+
+def test_critical_path():
+    jobs = [Job('replica', 'replica.py'), Job('maintenance', 'maintenance.py'), Job('export', 'export.py', ['replica', 'maintenance']),
+            Job('tiles', 'tiles.py', ['maintenance']), Job('report', 'report.py', ['export'])]
+    durations = {'replica': 10.0, 'maintenance': 30.0, 'export': 5.0, 'tiles': 20.0, 'report': 1.0}
+    results = {name: {'duration': duration} for name, duration in durations.items()}
+    chain, total = job_runner.critical_path(jobs, results)
+    assert chain == ['maintenance', 'tiles']
+    assert total == 50.0
+    # a skipped job adds no time
+    del results['tiles']
+    assert job_runner.critical_path(jobs, results) == (['maintenance', 'export', 'report'], 36.0)
+    assert job_runner.critical_path([], {}) == ([], 0.0)
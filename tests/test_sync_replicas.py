@@ -0,0 +1,153 @@
+# Tests for the replica scheduler in sync_replicas.py using a fake worker in place of arcpy
+# replicas run in threads so the fake worker can record what ran at the same time
+
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import sync_replicas
+
+
+# stands in for sync_replica(); each replica takes a short time and returns the status it is given
+class FakeWorker(object):
+    def __init__(self, statuses=None, duration=0.05):
+        self.statuses = statuses or {}
+        self.duration = duration
+        self.lock = threading.Lock()
+        self.started = []
+        self.running = {}
+        self.most_running = {}
+
+    def __call__(self, replica):
+        parent = replica['parent']
+        with self.lock:
+            self.started.append(replica['name'])
+            self.running[parent] = self.running.get(parent, 0) + 1
+            self.most_running[parent] = max(self.most_running.get(parent, 0), self.running[parent])
+        time.sleep(self.duration)
+        with self.lock:
+            self.running[parent] -= 1
+        status = self.statuses.get(replica['name'], 'completed')
+        if status == 'error':
+            raise RuntimeError(f"{replica['name']} stopped")
+        return {'name': replica['name'], 'status': status, 'duration': self.duration, 'changes': {}, 'error': None}
+
+
+def replica(name, parent='gis.sde', depends_on=None):
+    return {'name': name, 'parent': parent, 'child': f'{name}.gdb', 'depends_on': depends_on or []}
+
+
+def run(replicas, worker, max_workers=4, max_per_parent=2):
+    return sync_replicas.run_replicas(replicas, max_workers, max_per_parent, worker,
+                                      ThreadPoolExecutor(max_workers=max_workers))
+
+
+def test_limit_per_parent():
+    replicas = [replica(f'A{number}', 'a.sde') for number in range(5)] + [replica(f'B{number}', 'b.sde') for number in range(3)]
+    worker = FakeWorker()
+    results = run(replicas, worker, max_workers=4, max_per_parent=2)
+    assert worker.most_running == {'a.sde': 2, 'b.sde': 2}
+    assert sorted(result['name'] for result in results) == sorted(r['name'] for r in replicas)
+    assert all(result['status'] == 'completed' for result in results)
+
+
+def test_dependencies_finish_first():
+    replicas = [replica('Parcels', depends_on=['Roads', 'Addresses']), replica('Roads'), replica('Addresses', 'other.sde')]
+    worker = FakeWorker()
+    results = run(replicas, worker)
+    assert worker.started.index('Parcels') == 2
+    assert [result['name'] for result in results][-1] == 'Parcels'
+
+
+def test_failed_replica_skips_dependents():
+    replicas = [replica('Roads'), replica('Parcels', depends_on=['Roads']), replica('Zoning', depends_on=['Parcels']),
+                replica('Addresses')]
+    worker = FakeWorker({'Roads': 'failed'})
+    results = {result['name']: result for result in run(replicas, worker)}
+    assert results['Roads']['status'] == 'failed'
+    assert results['Parcels']['status'] == 'skipped'
+    assert results['Zoning']['status'] == 'skipped'
+    assert results['Addresses']['status'] == 'completed'
+    assert sorted(worker.started) == ['Addresses', 'Roads']
+
+
+def test_worker_error_fails_replica():
+    replicas = [replica('Roads'), replica('Parcels', depends_on=['Roads'])]
+    results = {result['name']: result for result in run(replicas, FakeWorker({'Roads': 'error'}))}
+    assert results['Roads']['status'] == 'failed'
+    assert 'Roads stopped' in results['Roads']['error']
+    assert results['Parcels']['status'] == 'skipped'
+
+
+def test_unchanged_replica_lets_dependents_run():
+    replicas = [replica('Roads'), replica('Parcels', depends_on=['Roads'])]
+    worker = FakeWorker({'Roads': 'unchanged'})
+    results = {result['name']: result for result in run(replicas, worker)}
+    assert results['Roads']['status'] == 'unchanged'
+    assert results['Parcels']['status'] == 'completed'
+    assert worker.started == ['Roads', 'Parcels']
+
+
+def test_circular_dependency_is_rejected():
+    replicas = [replica('Roads', depends_on=['Parcels']), replica('Parcels', depends_on=['Roads'])]
+    with pytest.raises(ValueError):
+        run(replicas, FakeWorker())
+
+
+# replace arcpy and the preflight with fakes so sync_replica() runs without a geodatabase
+@pytest.fixture
+def fake_preflight(monkeypatch, tmp_path):
+    synchronized = []
+    fake_arcpy = type('FakeArcpy', (), {'SynchronizeChanges_management': staticmethod(lambda *args: synchronized.append(args[1]))})
+    monkeypatch.setitem(sys.modules, 'arcpy', fake_arcpy)
+    monkeypatch.setattr(sync_replicas.replica_preflight, 'get_replica', lambda arcpy, parent, name: type('Replica', (), {'name': name}))
+    monkeypatch.setattr(sync_replicas.replica_preflight, 'rebuild_problem', lambda replica: None)
+    monkeypatch.setattr(sync_replicas.replica_preflight, 'estimate_changes',
+                        lambda arcpy, parent, replica, known_states, count_parent_rows:
+                        {'changes': {'gis.Roads': 0 if known_states else 3}, 'parent_rows': None, 'states': [1, 5], 'warning': None})
+    return {'synchronized': synchronized, 'states_file': str(tmp_path / 'roads_states.json')}
+
+
+def publish_failing(failing):
+    def publish_to_all(source, targets):
+        return [{'target': target, 'error': 'share offline'} if target in failing else {'target': target, 'copied': 1}
+                for target in targets]
+    return publish_to_all
+
+
+def test_states_are_saved_only_once_published(fake_preflight, monkeypatch):
+    replica = {'name': 'Roads', 'parent': 'gis.sde', 'child': 'roads.gdb', 'states_file': fake_preflight['states_file'],
+               'publish_to': ['share1', 'share2']}
+
+    # a network share fails; the states are not saved, so the next run synchronizes again
+    monkeypatch.setattr(sync_replicas.publish_file_geodatabase, 'publish_to_all', publish_failing(['share2']))
+    result = sync_replicas.sync_replica(replica)
+    assert result['status'] == 'failed' and 'share2: share offline' in result['error']
+    assert sync_replicas.replica_preflight.read_states(fake_preflight['states_file']) is None
+
+    # publishing succeeds
+    monkeypatch.setattr(sync_replicas.publish_file_geodatabase, 'publish_to_all', publish_failing([]))
+    result = sync_replicas.sync_replica(replica)
+    assert result['status'] == 'completed'
+    assert fake_preflight['synchronized'] == ['Roads', 'Roads']
+    assert sync_replicas.replica_preflight.read_states(fake_preflight['states_file']) == [1, 5]
+
+
+def test_unchanged_replica_is_published_to_every_share(fake_preflight, monkeypatch):
+    sync_replicas.replica_preflight.save_states(fake_preflight['states_file'], [1, 5])
+    replica = {'name': 'Roads', 'parent': 'gis.sde', 'child': 'roads.gdb', 'states_file': fake_preflight['states_file'],
+               'publish_to': ['share1', 'share2']}
+    published = []
+
+    def publish_to_all(source, targets):
+        published.extend(targets)
+        return [{'target': target, 'copied': 0} for target in targets]
+
+    monkeypatch.setattr(sync_replicas.publish_file_geodatabase, 'publish_to_all', publish_to_all)
+    result = sync_replicas.sync_replica(replica)
+    assert result['status'] == 'unchanged'
+    assert published == ['share1', 'share2']
+    assert fake_preflight['synchronized'] == []
@@ -0,0 +1,136 @@
+# Tests for tile_math.py using a synthetic tiling scheme and plain coordinates
+
+import pytest
+
+import tile_math
+
+# origin at (0, 1024); 256 pixel tiles; 1 and 2 map units per pixel
+SCHEME = tile_math.TilingScheme(0, 1024, 256, 256, [(0, 2000, 2.0), (1, 1000, 1.0)])
+
+
+# every (row, col) inside a list of (min_row, min_col, max_row, max_col) rectangles
+def rectangle_tiles(rectangles):
+    tiles = set()
+    for min_row, min_col, max_row, max_col in rectangles:
+        for row in range(min_row, max_row + 1):
+            for col in range(min_col, max_col + 1):
+                tiles.add((row, col))
+    return tiles
+
+
+def test_tile_size_uses_resolution_of_scale():
+    assert SCHEME.tile_size(1000) == (256, 256)
+    assert SCHEME.tile_size(2000.0000001) == (512, 512)
+    with pytest.raises(ValueError):
+        SCHEME.tile_size(5000)
+
+
+def test_tile_range_inside_one_tile():
+    assert tile_math.tile_range((10, 1000, 20, 1010), SCHEME, 1000) == (0, 0, 0, 0)
+
+
+def test_tile_range_edges_on_tile_boundary_do_not_spill():
+    # extent covers exactly the tiles in rows 0-1 and columns 1-2
+    assert tile_math.tile_range((256, 512, 768, 1024), SCHEME, 1000) == (0, 1, 1, 2)
+
+
+def test_tile_range_within_epsilon_of_boundary_does_not_spill():
+    extent = (256, 512, 768 + tile_math.EPSILON * 10, 1024)
+    assert tile_math.tile_range(extent, SCHEME, 1000) == (0, 1, 1, 2)
+
+
+def test_tile_range_just_past_boundary_spills():
+    assert tile_math.tile_range((256, 512, 768.01, 1024), SCHEME, 1000) == (0, 1, 1, 3)
+
+
+def test_tile_range_padding_reaches_neighbors():
+    extent = (300, 730, 310, 740)
+    assert tile_math.tile_range(extent, SCHEME, 1000) == (1, 1, 1, 1)
+    # 50 pixels at 1 map unit per pixel crosses the left (256) and top (768) tile edges
+    assert tile_math.tile_range(extent, SCHEME, 1000, pad_pixels=50) == (0, 0, 1, 1)
+    # 50 pixels at 2 map units per pixel stays within the 512 unit tile
+    assert tile_math.tile_range(extent, SCHEME, 2000, pad_pixels=50) == (0, 0, 0, 0)
+
+
+def test_tile_range_zero_area_extents():
+    # point
+    assert tile_math.tile_range((300, 700, 300, 700), SCHEME, 1000) == (1, 1, 1, 1)
+    # point on a tile corner falls in the tile to its lower right
+    assert tile_math.tile_range((256, 768, 256, 768), SCHEME, 1000) == (1, 1, 1, 1)
+    # horizontal line
+    assert tile_math.tile_range((10, 700, 600, 700), SCHEME, 1000) == (1, 0, 1, 2)
+    # vertical line
+    assert tile_math.tile_range((300, 10, 300, 1000), SCHEME, 1000) == (0, 1, 3, 1)
+
+
+def test_tile_range_left_of_and_above_origin():
+    assert tile_math.tile_range((-300, 1100, -200, 1200), SCHEME, 1000) == (-1, -2, -1, -1)
+
+
+def test_dirty_tiles_filter_drops_tiles():
+    tiles = tile_math.dirty_tiles([(0, 0, 512, 1024)], SCHEME, 1000)
+    assert len(tiles) == 8
+    diagonal = tile_math.dirty_tiles([(0, 0, 512, 1024)], SCHEME, 1000, tile_filter=lambda row, col: row == col)
+    assert diagonal == {(0, 0), (1, 1)}
+
+
+def test_merge_tiles_empty():
+    assert tile_math.merge_tiles(set()) == []
+
+
+def test_merge_tiles_single_tile():
+    assert tile_math.merge_tiles({(3, 4)}) == [(3, 4, 3, 4)]
+
+
+def test_merge_tiles_block():
+    tiles = {(row, col) for row in range(2, 5) for col in range(1, 4)}
+    assert tile_math.merge_tiles(tiles) == [(2, 1, 4, 3)]
+
+
+def test_merge_tiles_l_shape():
+    # vertical bar in column 0 with a foot along row 2
+    tiles = {(0, 0), (1, 0), (2, 0), (2, 1), (2, 2)}
+    rectangles = tile_math.merge_tiles(tiles)
+    assert rectangles == [(0, 0, 1, 0), (2, 0, 2, 2)]
+    assert rectangle_tiles(rectangles) == tiles
+
+
+def test_merge_tiles_gaps_are_not_filled():
+    # gap in column 2 and a missing row 3
+    tiles = {(0, 0), (0, 1), (0, 3), (1, 0), (1, 1), (1, 3), (4, 0), (4, 1)}
+    rectangles = tile_math.merge_tiles(tiles)
+    assert rectangles == [(0, 0, 1, 1), (0, 3, 1, 3), (4, 0, 4, 1)]
+    assert rectangle_tiles(rectangles) == tiles
+
+
+def test_merge_tiles_rectangles_do_not_overlap():
+    tiles = {(0, 0), (0, 1), (1, 1), (1, 2), (2, 0), (2, 1), (2, 2), (-1, 5)}
+    rectangles = tile_math.merge_tiles(tiles)
+    assert rectangle_tiles(rectangles) == tiles
+    assert sum((r[2] - r[0] + 1) * (r[3] - r[1] + 1) for r in rectangles) == len(tiles)
+
+
+def test_rectangle_extent():
+    assert tile_math.rectangle_extent((0, 1, 1, 2), SCHEME, 1000) == (256, 512, 768, 1024)
+    assert tile_math.rectangle_extent((0, 0, 0, 0), SCHEME, 2000) == (0, 512, 512, 1024)
+
+
+def test_rectangle_extent_round_trip():
+    for rectangle in [(0, 0, 0, 0), (0, 1, 1, 2), (-1, -2, 3, 4)]:
+        extent = tile_math.rectangle_extent(rectangle, SCHEME, 1000)
+        assert tile_math.tile_range(extent, SCHEME, 1000) == rectangle
+
+
+def test_dirty_extents_by_scale_round_trip():
+    extents = [(10, 1000, 20, 1010), (300, 700, 600, 700), (-300, 1100, -200, 1200)]
+    extents_by_scale, tile_counts = tile_math.dirty_extents_by_scale(extents, SCHEME, [1000, 2000])
+    for scale in (1000, 2000):
+        expected = tile_math.dirty_tiles(extents, SCHEME, scale)
+        assert tile_counts[scale] == len(expected)
+        # tiles covered by the merged extents are exactly the dirty tiles
+        covered = tile_math.dirty_tiles(extents_by_scale[scale], SCHEME, scale)
+        assert covered == expected
+
+
+def test_dirty_extents_by_scale_no_changes():
+    assert tile_math.dirty_extents_by_scale([], SCHEME, [1000]) == ({1000: []}, {1000: 0})
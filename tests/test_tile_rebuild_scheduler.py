@@ -0,0 +1,139 @@
+# Tests for tile_rebuild_scheduler.py against a fake cache service
+
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import tile_rebuild_scheduler
+
+EXTENTS_BY_SCALE = {
+    4513.988705: [(0, 0, 10, 10), (20, 0, 30, 10), (40, 0, 50, 10)],
+    72223.819286: [(0, 0, 100, 100)],
+    18055.954822: [(0, 0, 50, 50), (100, 0, 150, 50)],
+}
+
+
+# Class standing in for ManageMapServerCacheTiles; records the shards rebuilt in order
+class FakeCacheService(object):
+    def __init__(self, failing_scales=()):
+        self.failing_scales = set(failing_scales)
+        self.rebuilt = []
+        self._lock = threading.Lock()
+
+    def rebuild(self, shard):
+        if shard.scale in self.failing_scales:
+            raise RuntimeError(f'Tiles for {shard.scale} failed to rebuild')
+        with self._lock:
+            self.rebuilt.append(shard.key)
+
+
+# rebuild function defined in a module, so it can be sent to a process pool
+def fail_large_scales(shard):
+    if shard.scale < 10000:
+        raise RuntimeError('Cache job failed')
+
+
+def run(shards, service, checkpoint, max_workers=1):
+    return tile_rebuild_scheduler.run_shards(shards, service.rebuild, checkpoint, max_workers,
+                                             executor=ThreadPoolExecutor(max_workers=max_workers))
+
+
+def test_make_shards_orders_smaller_scales_first():
+    shards = tile_rebuild_scheduler.make_shards(EXTENTS_BY_SCALE, max_extents=2)
+    assert [shard.scale for shard in shards] == [72223.819286, 18055.954822, 4513.988705, 4513.988705]
+    assert [len(shard.extents) for shard in shards] == [1, 2, 2, 1]
+
+
+def test_make_shards_scale_priority_and_region_weight():
+    shards = tile_rebuild_scheduler.make_shards(EXTENTS_BY_SCALE, max_extents=1, scale_priority=[4513.988705],
+                                                region_weight=lambda extent: extent[0])
+    assert [shard.scale for shard in shards][:3] == [4513.988705] * 3
+    # busiest region (largest xmin here) first within a scale
+    assert [shard.extents[0][0] for shard in shards[:3]] == [40, 20, 0]
+
+
+def test_make_shards_splits_by_tile_count():
+    tile_counts = {4513.988705: [400, 400, 400]}
+    shards = tile_rebuild_scheduler.make_shards({4513.988705: EXTENTS_BY_SCALE[4513.988705]},
+                                                max_tiles=1000, tile_counts=tile_counts)
+    assert [shard.tile_count for shard in shards] == [800, 400]
+
+
+def test_shard_keys_stay_the_same_between_runs():
+    first = tile_rebuild_scheduler.make_shards(EXTENTS_BY_SCALE, max_extents=2)
+    second = tile_rebuild_scheduler.make_shards(EXTENTS_BY_SCALE, max_extents=2)
+    assert [shard.key for shard in first] == [shard.key for shard in second]
+    assert len(set(shard.key for shard in first)) == len(first)
+
+
+def test_run_shards_in_priority_order():
+    shards = tile_rebuild_scheduler.make_shards(EXTENTS_BY_SCALE, max_extents=2)
+    service = FakeCacheService()
+    results = run(shards, service, tile_rebuild_scheduler.Checkpoint(None, 'run'))
+    assert service.rebuilt == [shard.key for shard in shards]
+    assert [result.status for result in results] == ['completed'] * len(shards)
+
+
+def test_rerun_skips_completed_shards_and_retries_failed(tmp_path):
+    checkpoint_file = str(tmp_path / 'checkpoint.json')
+    shards = tile_rebuild_scheduler.make_shards(EXTENTS_BY_SCALE, max_extents=2)
+    failed_keys = [shard.key for shard in shards if shard.scale == 4513.988705]
+
+    # first run; one scale fails
+    checkpoint = tile_rebuild_scheduler.Checkpoint(checkpoint_file, 'run')
+    checkpoint.upper_bound = '2026-10-19 08:00:00.000000'
+    results = run(shards, FakeCacheService([4513.988705]), checkpoint, max_workers=2)
+    statuses = {result.shard.key: result.status for result in results}
+    assert [statuses[key] for key in failed_keys] == ['failed', 'failed']
+    failed = [result for result in results if result.status == 'failed'][0]
+    assert 'Tiles for 4513.988705 failed to rebuild' in failed.error.format()
+
+    # failed shards are not recorded in the checkpoint
+    with open(checkpoint_file) as f:
+        contents = json.load(f)
+    assert sorted(contents['completed']) == sorted(shard.key for shard in shards if shard.key not in failed_keys)
+    assert contents['upper_bound'] == '2026-10-19 08:00:00.000000'
+
+    # second run only rebuilds failed shards
+    checkpoint = tile_rebuild_scheduler.Checkpoint(checkpoint_file, 'run')
+    assert checkpoint.upper_bound == '2026-10-19 08:00:00.000000'
+    service = FakeCacheService()
+    results = run(shards, service, checkpoint)
+    assert service.rebuilt == failed_keys
+    assert [result.status for result in results].count('skipped') == len(shards) - len(failed_keys)
+
+    checkpoint.clear()
+    assert not (tmp_path / 'checkpoint.json').exists()
+
+
+def test_checkpoint_from_other_changes_is_ignored(tmp_path):
+    checkpoint_file = str(tmp_path / 'checkpoint.json')
+    shards = tile_rebuild_scheduler.make_shards(EXTENTS_BY_SCALE)
+    run(shards, FakeCacheService(), tile_rebuild_scheduler.Checkpoint(checkpoint_file, 'first'))
+    checkpoint = tile_rebuild_scheduler.Checkpoint(checkpoint_file, 'second')
+    assert checkpoint.completed == {}
+    assert checkpoint.upper_bound is None
+
+
+def test_first_run_keeps_its_start_date(tmp_path):
+    checkpoint_file = str(tmp_path / 'checkpoint.json')
+    checkpoint = tile_rebuild_scheduler.Checkpoint(checkpoint_file, 'service|first run')
+    checkpoint.lower_bound = '2026-10-11'
+    checkpoint.upper_bound = '2026-10-19 08:00:00.000000'
+    checkpoint.save()
+
+    # rerun on a later day finds the start date of the failed run
+    checkpoint = tile_rebuild_scheduler.Checkpoint(checkpoint_file, 'service|first run')
+    assert checkpoint.lower_bound == '2026-10-11'
+    assert checkpoint.upper_bound == '2026-10-19 08:00:00.000000'
+    checkpoint.clear()
+    assert checkpoint.lower_bound is None
+
+
+def test_run_shards_in_process_pool(tmp_path):
+    shards = tile_rebuild_scheduler.make_shards(EXTENTS_BY_SCALE)
+    checkpoint = tile_rebuild_scheduler.Checkpoint(str(tmp_path / 'checkpoint.json'), 'run')
+    results = tile_rebuild_scheduler.run_shards(shards, fail_large_scales, checkpoint, max_workers=2)
+    assert [result.status for result in results] == ['completed', 'completed', 'failed']
+    assert 'Cache job failed' in results[2].error.format()
+    assert sorted(checkpoint.completed) == sorted(shard.key for shard in shards[:2])
@@ -0,0 +1,184 @@
+#-------------------------------------------------------------------------------
+# Name:        Tile Math Helper Module
+#
+# Purpose:     Computes the exact cache tiles (rows and columns) touched by changed
+#              features at each scale of a cached map service, and merges them into
+#              compact rectangles that can be submitted as areas of interest
+#              when rebuilding tiles.
+#
+#              The tiling scheme is read from the "tileInfo" section of the map service
+#              REST endpoint (i.e., https://server/arcgis/rest/services/MyService/MapServer?f=json).
+#              No ArcPy is required, so the math can be checked with plain coordinates.
+#
+# Author:      Patrick McKinney
+#
+# Created:     10/19/2026
+#
+# Updated:     10/19/2026
+#-------------------------------------------------------------------------------
+
+import json
+import math
+from urllib.request import urlopen
+from urllib.parse import urlencode
+
+# small tolerance so edges that fall exactly on a tile boundary do not spill into the next tile
+EPSILON = 1e-9
+
+
+# Class to store the tiling scheme of a cached map service
+class TilingScheme(object):
+    def __init__(self, origin_x, origin_y, tile_cols, tile_rows, lods, wkid=None):
+        # upper left corner of the tiling scheme
+        self.origin_x = float(origin_x)
+        self.origin_y = float(origin_y)
+        # tile width and height in pixels
+        self.tile_cols = int(tile_cols)
+        self.tile_rows = int(tile_rows)
+        # list of (level, scale, resolution) tuples
+        self.lods = [(int(level), float(scale), float(resolution)) for level, scale, resolution in lods]
+        # well-known ID of the spatial reference of the tiling scheme
+        self.wkid = wkid
+
+    # get the resolution (map units per pixel) for a scale
+    def resolution_for_scale(self, scale):
+        for level, lod_scale, resolution in self.lods:
+            # scales from the REST endpoint carry long decimals; compare loosely
+            if math.isclose(lod_scale, float(scale), rel_tol=1e-6):
+                return resolution
+        raise ValueError(f'Scale {scale} is not part of the tiling scheme')
+
+    # width and height of a tile in map units for a scale
+    def tile_size(self, scale):
+        resolution = self.resolution_for_scale(scale)
+        return self.tile_cols * resolution, self.tile_rows * resolution
+# end TilingScheme
+
+
+# create tiling scheme from the "tileInfo" dictionary of a map service
+def tiling_scheme_from_tile_info(tile_info):
+    lods = [(lod['level'], lod['scale'], lod['resolution']) for lod in tile_info['lods']]
+    spatial_reference = tile_info.get('spatialReference', {})
+    wkid = spatial_reference.get('latestWkid', spatial_reference.get('wkid'))
+    return TilingScheme(tile_info['origin']['x'], tile_info['origin']['y'],
+                        tile_info['cols'], tile_info['rows'], lods, wkid)
+# end tiling_scheme_from_tile_info
+
+
+# read tiling scheme from the REST endpoint of a map service
+def get_tiling_scheme(service_url, token=None):
+    params = {'f': 'json'}
+    if token:
+        params['token'] = token
+    with urlopen(f'{service_url}?{urlencode(params)}') as response:
+        service_info = json.load(response)
+    if 'tileInfo' not in service_info:
+        raise ValueError(f'{service_url} is not a cached map service')
+    return tiling_scheme_from_tile_info(service_info['tileInfo'])
+# end get_tiling_scheme
+
+
+# get the range of tiles covered by an extent at a scale
+# extent is (xmin, ymin, xmax, ymax)
+# pad_pixels grows the extent so symbols and labels drawn past a feature's edge are included
+# returns (min_row, min_col, max_row, max_col)
+def tile_range(extent, scheme, scale, pad_pixels=0):
+    xmin, ymin, xmax, ymax = extent
+    tile_width, tile_height = scheme.tile_size(scale)
+    pad = pad_pixels * scheme.resolution_for_scale(scale)
+
+    # columns grow to the right of the origin
+    min_col = math.floor((xmin - pad - scheme.origin_x) / tile_width)
+    max_col = math.ceil((xmax + pad - scheme.origin_x) / tile_width - EPSILON) - 1
+    # rows grow downward from the origin
+    min_row = math.floor((scheme.origin_y - (ymax + pad)) / tile_height)
+    max_row = math.ceil((scheme.origin_y - (ymin - pad)) / tile_height - EPSILON) - 1
+
+    # points and lines with no width or height still fall within one tile
+    return min_row, min_col, max(min_row, max_row), max(min_col, max_col)
+# end tile_range
+
+
+# get set of (row, column) tiles touched by a list of extents at a scale
+# tile_filter is an optional function(row, col) used to drop tiles that only the extent,
+# but not the actual geometry, touches
+def dirty_tiles(extents, scheme, scale, pad_pixels=0, tile_filter=None):
+    tiles = set()
+    for extent in extents:
+        min_row, min_col, max_row, max_col = tile_range(extent, scheme, scale, pad_pixels)
+        for row in range(min_row, max_row + 1):
+            for col in range(min_col, max_col + 1):
+                if tile_filter is None or tile_filter(row, col):
+                    tiles.add((row, col))
+    return tiles
+# end dirty_tiles
+
+
+# merge a set of (row, column) tiles into rectangles
+# runs of adjacent columns are found in each row,
+# then identical runs in consecutive rows are stacked together
+# returns list of (min_row, min_col, max_row, max_col) tuples
+def merge_tiles(tiles):
+    # group columns by row
+    rows = {}
+    for row, col in tiles:
+        rows.setdefault(row, []).append(col)
+
+    # rectangles still able to grow downward, keyed by (min_col, max_col)
+    open_rects = {}
+    rectangles = []
+    previous_row = None
+    for row in sorted(rows):
+        # find runs of adjacent columns within row
+        runs = []
+        cols = sorted(rows[row])
+        start = end = cols[0]
+        for col in cols[1:]:
+            if col == end + 1:
+                end = col
+            else:
+                runs.append((start, end))
+                start = end = col
+        runs.append((start, end))
+
+        # close rectangles that cannot continue into this row
+        still_open = {}
+        for run in runs:
+            if previous_row is not None and row == previous_row + 1 and run in open_rects:
+                still_open[run] = open_rects.pop(run)
+            else:
+                still_open[run] = row
+        for (min_col, max_col), min_row in open_rects.items():
+            rectangles.append((min_row, min_col, previous_row, max_col))
+        open_rects = still_open
+        previous_row = row
+
+    for (min_col, max_col), min_row in open_rects.items():
+        rectangles.append((min_row, min_col, previous_row, max_col))
+    return sorted(rectangles)
+# end merge_tiles
+
+
+# convert a rectangle of tiles into a map extent (xmin, ymin, xmax, ymax)
+def rectangle_extent(rectangle, scheme, scale):
+    min_row, min_col, max_row, max_col = rectangle
+    tile_width, tile_height = scheme.tile_size(scale)
+    xmin = scheme.origin_x + min_col * tile_width
+    xmax = scheme.origin_x + (max_col + 1) * tile_width
+    ymax = scheme.origin_y - min_row * tile_height
+    ymin = scheme.origin_y - (max_row + 1) * tile_height
+    return xmin, ymin, xmax, ymax
+# end rectangle_extent
+
+
+# get extents to rebuild at each scale for a list of changed extents
+# returns dictionary of scale: [(xmin, ymin, xmax, ymax), ...] and count of dirty tiles per scale
+def dirty_extents_by_scale(extents, scheme, scales, pad_pixels=0):
+    extents_by_scale = {}
+    tile_counts = {}
+    for scale in scales:
+        tiles = dirty_tiles(extents, scheme, scale, pad_pixels)
+        tile_counts[scale] = len(tiles)
+        extents_by_scale[scale] = [rectangle_extent(rect, scheme, scale) for rect in merge_tiles(tiles)]
+    return extents_by_scale, tile_counts
+# end dirty_extents_by_scale
@@ -0,0 +1,251 @@
+#-------------------------------------------------------------------------------
+# Name:        Tile Rebuild Scheduler Helper Module
+#
+# Purpose:     Splits the areas to rebuild in a cached map service into shards by
+#              scale and region, and runs the shards with a limited number of jobs
+#              at a time.  Scales that are viewed most are run first.
+#
+#              ArcPy geoprocessing tools are not safe to run from several threads, so
+#              each shard is rebuilt in a separate process (see rebuild_cache_shard()).
+#
+#              Each completed shard is written to a checkpoint file (JSON).  If the
+#              script fails or times out part way through, running it again skips the
+#              shards that already completed.
+#
+#              The function that rebuilds a shard and the pool it runs in are passed in,
+#              so the scheduler can be run against a fake cache service without ArcGIS
+#              Server (see tests/test_tile_rebuild_scheduler.py).
+#
+# Author:      Patrick McKinney
+#
+# Created:     10/19/2026
+#
+# Updated:     10/19/2026
+#-------------------------------------------------------------------------------
+
+import hashlib
+import json
+import print_errors
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import as_completed
+from os import path
+from os import remove
+from os import replace
+
+
+# Class for one piece of a rebuild job; a list of extents at one scale
+class Shard(object):
+    def __init__(self, scale, extents, tile_count=None):
+        self.scale = scale
+        # list of (xmin, ymin, xmax, ymax) tuples
+        self.extents = list(extents)
+        self.tile_count = tile_count
+        # key stays the same between runs for the same scale and extents
+        # used to find shard in checkpoint file
+        rounded = [[round(value, 6) for value in extent] for extent in self.extents]
+        digest = hashlib.sha1(json.dumps(rounded).encode('utf-8')).hexdigest()[:12]
+        self.key = f'{scale}:{digest}'
+
+    def __repr__(self):
+        return f'Shard({self.key}, {len(self.extents)} extents)'
+# end Shard
+
+
+# Class for the result of running a shard
+class ShardResult(object):
+    def __init__(self, shard, status, duration=0.0, error=None):
+        self.shard = shard
+        # 'completed', 'skipped' (completed in an earlier run), or 'failed'
+        self.status = status
+        # time in seconds
+        self.duration = duration
+        # print_errors.CapturedError for a failed shard
+        self.error = error
+
+    def __repr__(self):
+        return f'ShardResult({self.shard.key}, {self.status}, {round(self.duration, 2)}s)'
+# end ShardResult
+
+
+# order scales so the most viewed are run first
+# scale_priority is an optional list of scales, most viewed first; scales not listed follow it
+# by default smaller scales (larger scale denominators, zoomed out) come first since every visit to the map starts there
+def order_scales(scales, scale_priority=None):
+    scale_priority = list(scale_priority or [])
+    listed = [scale for scale in scale_priority if scale in scales]
+    unlisted = sorted((scale for scale in scales if scale not in scale_priority), key=float, reverse=True)
+    return listed + unlisted
+# end order_scales
+
+
+# split extents to rebuild into shards
+# extents_by_scale is a dictionary of scale: [(xmin, ymin, xmax, ymax), ...]
+# tile_counts is an optional dictionary of scale: [tiles in each extent, ...] used to balance shards
+# shards hold at most max_extents extents and (if tile counts are given) at most max_tiles tiles
+# extents next to each other in the list are kept together, so each shard covers one region
+# region_weight is an optional function(extent) (i.e., edit density from edit_density.py);
+# within each scale, shards covering busier regions run first
+def make_shards(extents_by_scale, max_extents=25, max_tiles=None, tile_counts=None, scale_priority=None, region_weight=None):
+    shards = []
+    for scale in order_scales(list(extents_by_scale), scale_priority):
+        scale_shards = []
+        extents = extents_by_scale[scale]
+        counts = (tile_counts or {}).get(scale) or [None] * len(extents)
+        group = []
+        group_tiles = 0
+        for extent, count in zip(extents, counts):
+            full = len(group) >= max_extents or (
+                max_tiles and count is not None and group and group_tiles + count > max_tiles)
+            if full:
+                scale_shards.append(Shard(scale, group, group_tiles if tile_counts else None))
+                group = []
+                group_tiles = 0
+            group.append(extent)
+            group_tiles += count or 0
+        if group:
+            scale_shards.append(Shard(scale, group, group_tiles if tile_counts else None))
+        if region_weight:
+            # sort is stable, so shards with the same weight keep their order
+            scale_shards.sort(key=lambda shard: sum(region_weight(extent) for extent in shard.extents), reverse=True)
+        shards += scale_shards
+    return shards
+# end make_shards
+
+
+# Class for reading and writing the checkpoint file
+# checkpoints are only read and written by the process running the scheduler
+class Checkpoint(object):
+    def __init__(self, checkpoint_file, run_id):
+        self.checkpoint_file = checkpoint_file
+        # identifies the set of changes being rebuilt (i.e., the service and the edit date processing starts from)
+        # a checkpoint left from a different set of changes is ignored
+        self.run_id = run_id
+        self.completed = {}
+        # newest edit date included in the changes being rebuilt, as text
+        # a rerun selects the same changes up to this date, so it gets the same shards; newer edits wait for the next run
+        self.upper_bound = None
+        # oldest edit date included in the changes being rebuilt, as text, when there is no watermark to start from
+        # (i.e., the first run selects edits from a number of days ago, which would otherwise change each day)
+        self.lower_bound = None
+        if checkpoint_file and path.exists(checkpoint_file):
+            with open(checkpoint_file) as f:
+                contents = json.load(f)
+            if contents.get('run_id') == run_id:
+                self.completed = contents.get('completed', {})
+                self.upper_bound = contents.get('upper_bound')
+                self.lower_bound = contents.get('lower_bound')
+
+    # check if shard completed in an earlier run
+    def is_completed(self, shard):
+        return shard.key in self.completed
+
+    # write checkpoint file
+    # file is written to a temporary name and then renamed so a failed write does not lose the previous checkpoint
+    def save(self):
+        if not self.checkpoint_file:
+            return
+        temp_file = f'{self.checkpoint_file}.tmp'
+        with open(temp_file, 'w') as f:
+            json.dump({'run_id': self.run_id, 'lower_bound': self.lower_bound, 'upper_bound': self.upper_bound,
+                       'completed': self.completed}, f)
+        replace(temp_file, self.checkpoint_file)
+
+    # record completed shard and write checkpoint file
+    def mark_completed(self, shard, duration):
+        self.completed[shard.key] = round(duration, 3)
+        self.save()
+
+    # remove checkpoint file once every shard has completed
+    def clear(self):
+        self.completed = {}
+        self.upper_bound = None
+        self.lower_bound = None
+        if self.checkpoint_file and path.exists(self.checkpoint_file):
+            remove(self.checkpoint_file)
+# end Checkpoint
+
+
+# rebuild one shard and time it; runs in the worker process
+# errors are captured here, where the traceback and geoprocessing messages are available
+def _run_shard(rebuild, shard):
+    start_time = time.perf_counter()
+    try:
+        rebuild(shard)
+    except Exception as e:
+        return ShardResult(shard, 'failed', time.perf_counter() - start_time, print_errors.capture_exception(e, shard.key))
+    return ShardResult(shard, 'completed', time.perf_counter() - start_time)
+# end _run_shard
+
+
+# run shards, at most max_workers at a time, in the order given
+# rebuild is a function(shard) that rebuilds the tiles of a shard and raises an error if it fails
+# by default shards run in a pool of max_workers processes, so rebuild must be a function defined in a module
+# (use functools.partial to pass it other arguments); executor can be replaced (i.e., with a thread pool and a fake cache service)
+# on_result is an optional function(result) called as each shard finishes (i.e., to write a log message)
+# completed shards are recorded in the checkpoint as they finish
+# a failed shard does not stop the others; it is run again on the next run
+# returns list of ShardResult objects in the order shards were given
+def run_shards(shards, rebuild, checkpoint, max_workers=2, on_result=None, executor=None):
+    results = {}
+
+    def record(result):
+        results[result.shard.key] = result
+        if on_result:
+            on_result(result)
+
+    pending = []
+    for shard in shards:
+        if checkpoint.is_completed(shard):
+            record(ShardResult(shard, 'skipped'))
+        else:
+            pending.append(shard)
+
+    # shards are queued in priority order; workers take them from the front of the queue
+    executor = executor or ProcessPoolExecutor(max_workers=max_workers)
+    with executor:
+        futures = {executor.submit(_run_shard, rebuild, shard): shard for shard in pending}
+        for future in as_completed(futures):
+            shard = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                # i.e., the worker process stopped unexpectedly, or the result could not be sent back
+                result = ShardResult(shard, 'failed', error=print_errors.capture_exception(e, shard.key))
+            if result.status == 'completed':
+                checkpoint.mark_completed(shard, result.duration)
+            record(result)
+
+    return [results[shard.key] for shard in shards]
+# end run_shards
+
+
+# sign in to Portal or ArcGIS Online in a worker process
+# used as the initializer of the process pool, since each process has its own sign-in
+def sign_in_worker(portal, user, password):
+    import arcpy
+    arcpy.SignInToPortal(portal, user, password)
+# end sign_in_worker
+
+
+# rebuild the tiles of a shard in a cached map service; runs in a worker process
+# arcpy is imported here so each process loads its own copy
+# wkid is the well-known ID of the spatial reference of the cache
+# see https://pro.arcgis.com/en/pro-app/tool-reference/server/manage-map-server-cache-tiles.htm
+def rebuild_cache_shard(service_url, wkid, shard):
+    import arcpy
+    cache_sr = arcpy.SpatialReference(wkid) if wkid else None
+    # create polygons for extents to use as area of interest
+    polygons = [arcpy.Extent(*extent, spatial_reference=cache_sr).polygon for extent in shard.extents]
+    dirty_tiles_fc = rf'memory\dirty_tiles_{shard.key.split(":")[-1]}'
+    arcpy.CopyFeatures_management(polygons, dirty_tiles_fc)
+    try:
+        # create feature set object
+        # see https://pro.arcgis.com/en/pro-app/arcpy/classes/featureset.htm
+        feature_set = arcpy.FeatureSet()
+        # load extents into feature set
+        feature_set.load(dirty_tiles_fc)
+        arcpy.server.ManageMapServerCacheTiles(service_url, [shard.scale], 'RECREATE_ALL_TILES', -1, feature_set, wait_for_job_completion='WAIT')
+    finally:
+        arcpy.Delete_management(dirty_tiles_fc)
+# end rebuild_cache_shard